@@ -0,0 +1,163 @@
+"""
+Local verification of Google ID tokens.
+
+Tokens are checked with PyJWT against Google's signing keys (JWKS) instead of
+a call to the tokeninfo endpoint per sign-in. Keys are kept in-process for
+as long as the key source's Cache-Control max-age allows, and re-fetched
+early only when a token names a key id we haven't seen (key rotation).
+
+The key source is pluggable through GOOGLE_JWKS_SOURCE: an http(s) URL
+(Google's certs endpoint by default), or a path / file:// URL to a local
+JWKS file for tests and offline setups.
+"""
+import json
+import logging
+import re
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleTokenError(Exception):
+    """The token is malformed, badly signed, expired or not meant for us."""
+
+
+class KeySourceError(Exception):
+    """The signing keys could not be loaded."""
+
+
+class URLKeySource:
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self):
+        """Return (jwks, max_age or None)."""
+        try:
+            r = requests.get(self.url, timeout=self.timeout)
+            r.raise_for_status()
+            jwks = r.json()
+        except (requests.RequestException, ValueError) as e:
+            raise KeySourceError(str(e)) from e
+        match = _MAX_AGE.search(r.headers.get("Cache-Control", ""))
+        return jwks, int(match.group(1)) if match else None
+
+
+class FileKeySource:
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f), None
+        except (OSError, ValueError) as e:
+            raise KeySourceError(str(e)) from e
+
+
+def key_source_for(spec):
+    if spec.startswith(("http://", "https://")):
+        return URLKeySource(spec)
+    return FileKeySource(spec[len("file://"):] if spec.startswith("file://") else spec)
+
+
+class KeyCache:
+    """kid -> PyJWK, refreshed when max-age lapses or an unknown kid shows up."""
+
+    def __init__(self, source, default_max_age=3600, min_refresh_interval=60):
+        self.source = source
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        jwks, max_age = self.source.fetch()
+        keys = {}
+        for data in jwks.get("keys", []):
+            try:
+                key = jwt.PyJWK(data)
+            except jwt.PyJWKError:
+                logger.warning("Skipping unusable JWKS key %s", data.get("kid"))
+                continue
+            keys[key.key_id] = key
+        now = time.monotonic()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + (self.default_max_age if max_age is None else max_age)
+
+    def get(self, kid):
+        now = time.monotonic()
+        key = self._keys.get(kid)
+        if key is not None and now < self._expires_at:
+            return key
+        with self._lock:
+            key = self._keys.get(kid)
+            now = time.monotonic()
+            expired = now >= self._expires_at
+            # Unknown kid with fresh keys: re-fetch, but not on every bogus token
+            if expired or (key is None and now - self._fetched_at >= self.min_refresh_interval):
+                try:
+                    self._refresh()
+                except KeySourceError:
+                    if not self._keys:
+                        raise
+                    # Keep serving the keys we have rather than failing sign-ins
+                    logger.warning("Could not refresh Google signing keys; using cached ones", exc_info=True)
+                key = self._keys.get(kid)
+        if key is None:
+            raise GoogleTokenError("Unknown signing key")
+        return key
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_key_cache():
+    spec = getattr(settings, "GOOGLE_JWKS_SOURCE", GOOGLE_CERTS_URL)
+    with _caches_lock:
+        if spec not in _caches:
+            _caches[spec] = KeyCache(
+                key_source_for(spec),
+                default_max_age=getattr(settings, "GOOGLE_JWKS_DEFAULT_MAX_AGE", 3600),
+            )
+        return _caches[spec]
+
+
+def verify_id_token(token, audiences=()):
+    """
+    Return the claims of a valid Google ID token. Audience is checked only
+    when `audiences` is non-empty. Raises GoogleTokenError or KeySourceError.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError as e:
+        raise GoogleTokenError(str(e)) from e
+    key = get_key_cache().get(header.get("kid"))
+    audiences = list(audiences)
+    try:
+        claims = jwt.decode(
+            token,
+            key=key.key,
+            algorithms=["RS256"],
+            audience=audiences or None,
+            options={"verify_aud": bool(audiences), "require": ["exp", "iat", "iss"]},
+            leeway=getattr(settings, "GOOGLE_TOKEN_LEEWAY_SECONDS", 30),
+        )
+    except jwt.InvalidTokenError as e:
+        raise GoogleTokenError(str(e)) from e
+    if claims.get("iss") not in GOOGLE_ISSUERS:
+        raise GoogleTokenError("Invalid issuer")
+    return claims
@@ -6,16 +6,19 @@ from .serializers import ResetPinSerializer, GoogleAuthInSerializer, GoogleAuthO
 from django.db import transaction
 from .tasks import send_password_reset_notification
 import os
-import requests
+import jwt
+from .google import GoogleTokenError, KeySourceError, verify_id_token
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema, OpenApiTypes
+from users.throttles import AuthIPRateThrottle, ResetPinRateThrottle
 
 User = get_user_model()
 
 class ResetPinView(APIView):
     authentication_classes = []  # unauthenticated for now (biometric is on-device)
-    permission_classes = []      # add throttling/rate limit in production
+    permission_classes = []
+    throttle_classes = [AuthIPRateThrottle, ResetPinRateThrottle]
 
     @extend_schema(
         request=ResetPinSerializer,
@@ -52,29 +55,27 @@ class GoogleAuthView(APIView):
         if not id_token:
             return Response({'detail': 'id_token is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Validate audience (client id)
+        allowed_aud = {x.strip() for x in [
+            os.getenv('GOOGLE_CLIENT_ID_ANDROID', ''),
+            os.getenv('GOOGLE_CLIENT_ID_IOS', ''),
+            os.getenv('GOOGLE_CLIENT_ID_WEB', ''),
+        ] if x.strip()}
+
+        # Verified locally against Google's cached signing keys (auth_app.google)
         try:
-            r = requests.get('https://oauth2.googleapis.com/tokeninfo', params={'id_token': id_token}, timeout=6)
-        except Exception:
+            data = verify_id_token(id_token, audiences=allowed_aud)
+        except KeySourceError:
             return Response({'detail': 'Failed to validate token'}, status=status.HTTP_400_BAD_REQUEST)
-
-        if r.status_code != 200:
+        except GoogleTokenError as e:
+            if isinstance(e.__cause__, jwt.InvalidAudienceError):
+                return Response({'detail': 'Token audience mismatch'}, status=status.HTTP_400_BAD_REQUEST)
             return Response({'detail': 'Invalid Google token'}, status=status.HTTP_400_BAD_REQUEST)
 
-        data = r.json()
-        aud = data.get('aud')
         email = data.get('email')
         email_verified = str(data.get('email_verified', '')).lower() in {'1', 'true', 'yes'}
         name = data.get('name') or ''
 
-        # Validate audience (client id)
-        allowed_aud = {x.strip() for x in [
-            os.getenv('GOOGLE_CLIENT_ID_ANDROID', ''),
-            os.getenv('GOOGLE_CLIENT_ID_IOS', ''),
-            os.getenv('GOOGLE_CLIENT_ID_WEB', ''),
-        ] if x.strip()}
-        if allowed_aud and aud not in allowed_aud:
-            return Response({'detail': 'Token audience mismatch'}, status=status.HTTP_400_BAD_REQUEST)
-
         if not email or not email_verified:
             return Response({'detail': 'Email not verified'}, status=status.HTTP_400_BAD_REQUEST)
 
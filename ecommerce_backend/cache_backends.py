@@ -0,0 +1,383 @@
+"""
+Cache backends for the shared catalog cache.
+
+SQLiteCache keeps entries in a single SQLite file in WAL mode, so every
+gunicorn worker and Celery process on the host sees the same page cache,
+generation counters and throttle history. It's meant for single-host
+deployments without Redis; with Redis available, use django-redis.
+
+TieredCache puts a small in-process LRU (L1) in front of either of them (L2)
+for hot catalog keys.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache_entries ("
+    " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)",
+    "CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires)",
+)
+# Stay under SQLite's default limit on bound parameters
+CHUNK_SIZE = 500
+# Check MAX_ENTRIES once per this many writes instead of counting rows on each set
+CULL_EVERY = 100
+
+
+class SQLiteCache(BaseCache):
+    """
+    LOCATION is the database file path. OPTIONS accepts MAX_ENTRIES and
+    CULL_FREQUENCY like Django's own backends, plus BUSY_TIMEOUT (seconds to
+    wait for another process's write lock, default 5).
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get("OPTIONS", {})
+        self._busy_timeout = float(options.get("BUSY_TIMEOUT", 5))
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+
+    # Connection -------------------------------------------------------
+
+    @property
+    def _db(self):
+        # Reopen after fork: SQLite connections must not cross processes
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _write(self):
+        """Context manager for a write transaction that takes the lock up front."""
+        return _Immediate(self._db)
+
+    # Helpers ----------------------------------------------------------
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _live(expires, now):
+        return expires is None or expires > now
+
+    def _maybe_cull(self, db):
+        self._writes += 1
+        if self._writes % CULL_EVERY:
+            return
+        db.execute("DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        (count,) = db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        if count > self._max_entries:
+            if self._cull_frequency == 0:
+                db.execute("DELETE FROM cache_entries")
+            else:
+                # Soonest-to-expire first; entries without a timeout go last
+                db.execute(
+                    "DELETE FROM cache_entries WHERE key IN ("
+                    " SELECT key FROM cache_entries ORDER BY expires IS NULL, expires LIMIT ?)",
+                    (count // self._cull_frequency,),
+                )
+
+    # BaseCache API ----------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._db.execute("SELECT value, expires FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None or not self._live(row[1], time.time()):
+            return default
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        found = {}
+        now = time.time()
+        made = list(key_map)
+        for start in range(0, len(made), CHUNK_SIZE):
+            chunk = made[start:start + CHUNK_SIZE]
+            rows = self._db.execute(
+                "SELECT key, value, expires FROM cache_entries WHERE key IN (%s)" % ",".join("?" * len(chunk)),
+                chunk,
+            )
+            for made_key, value, expires in rows:
+                if self._live(expires, now):
+                    found[key_map[made_key]] = pickle.loads(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value, expires = self._dumps(value), self.get_backend_timeout(timeout)
+        with self._write() as db:
+            db.execute("INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)", (key, value, expires))
+            self._maybe_cull(db)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [(self.make_and_validate_key(key, version=version), self._dumps(value), expires) for key, value in data.items()]
+        with self._write() as db:
+            db.executemany("INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)", rows)
+            self._maybe_cull(db)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value, expires = self._dumps(value), self.get_backend_timeout(timeout)
+        with self._write() as db:
+            row = db.execute("SELECT expires FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self._live(row[0], time.time()):
+                return False
+            db.execute("INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)", (key, value, expires))
+            self._maybe_cull(db)
+            return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as db:
+            cursor = db.execute(
+                "UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (self.get_backend_timeout(timeout), key, time.time()),
+            )
+            return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as db:
+            row = db.execute("SELECT value, expires FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is None or not self._live(row[1], time.time()):
+                raise ValueError("Key '%s' not found" % key)
+            new_value = pickle.loads(row[0]) + delta
+            db.execute("UPDATE cache_entries SET value = ? WHERE key = ?", (self._dumps(new_value), key))
+            return new_value
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._db.execute("SELECT expires FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        return row is not None and self._live(row[0], time.time())
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as db:
+            return db.execute("DELETE FROM cache_entries WHERE key = ?", (key,)).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        rows = [(self.make_and_validate_key(key, version=version),) for key in keys]
+        if rows:
+            with self._write() as db:
+                db.executemany("DELETE FROM cache_entries WHERE key = ?", rows)
+
+    def clear(self):
+        with self._write() as db:
+            db.execute("DELETE FROM cache_entries")
+
+    def close(self, **kwargs):
+        # Called at the end of every request; keep the connection for the next one
+        pass
+
+
+class _Immediate:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+# Raw key prefix -> L1 lifetime in seconds; longest match wins, other keys
+# (throttles, reservations, ...) always go to L2. Page keys embed the catalog
+# generations, so the short TTL on the generation counters is what bounds how
+# long a worker keeps serving a page after an invalidation.
+DEFAULT_L1_PREFIXES = {
+    "catalog:gen:": 1,
+    "catalog:stock:": 2,
+    "catalog:": 30,
+    "views.decorators.cache.": 30,
+}
+
+_l1_stores = {}
+_l1_stores_lock = threading.Lock()
+
+
+class _LocalLRU:
+    """Process-wide bounded LRU of pickled values, shared by all threads."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def named(cls, name, max_entries):
+        with _l1_stores_lock:
+            store = _l1_stores.get(name)
+            if store is None:
+                store = _l1_stores[name] = cls(max_entries)
+            return store
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, blob, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, blob)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache(BaseCache):
+    """
+    Read-through L1 in front of the cache alias named by OPTIONS["SHARED"].
+
+    Writes always go to L2 and update or evict this worker's L1 entry. Other
+    workers pick up changes when their L1 entry expires (OPTIONS
+    "L1_PREFIXES", see DEFAULT_L1_PREFIXES). L1 holds pickled bytes, so each
+    hit returns a fresh object like any other backend and callers may mutate
+    it. MAX_ENTRIES bounds L1; key prefix and version come from L2.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._shared_alias = options.get("SHARED", "shared")
+        rules = options.get("L1_PREFIXES", DEFAULT_L1_PREFIXES)
+        self._l1_rules = sorted(rules.items(), key=lambda rule: -len(rule[0]))
+        self._l1 = _LocalLRU.named(location or self._shared_alias, self._max_entries)
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _l1_ttl(self, key):
+        for prefix, ttl in self._l1_rules:
+            if key.startswith(prefix):
+                return ttl
+        return None
+
+    def _l1_key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    def _remember(self, key, value, version, timeout=DEFAULT_TIMEOUT):
+        ttl = self._l1_ttl(key)
+        if ttl is None:
+            return
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            ttl = min(ttl, timeout)
+        if ttl > 0:
+            self._l1.set(self._l1_key(key, version), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ttl)
+        else:
+            self._l1.delete(self._l1_key(key, version))
+
+    def _forget(self, key, version):
+        if self._l1_ttl(key) is not None:
+            self._l1.delete(self._l1_key(key, version))
+
+    def get(self, key, default=None, version=None):
+        if self._l1_ttl(key) is None:
+            return self.shared.get(key, default, version=version)
+        blob = self._l1.get(self._l1_key(key, version))
+        if blob is not None:
+            return pickle.loads(blob)
+        value = self.shared.get(key, self._missing_key, version=version)
+        if value is self._missing_key:
+            return default
+        self._remember(key, value, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, remote = {}, []
+        for key in keys:
+            blob = self._l1.get(self._l1_key(key, version)) if self._l1_ttl(key) is not None else None
+            if blob is not None:
+                found[key] = pickle.loads(blob)
+            else:
+                remote.append(key)
+        if remote:
+            fetched = self.shared.get_many(remote, version=version)
+            for key, value in fetched.items():
+                self._remember(key, value, version)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(key, value, version, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._remember(key, value, version, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(key, value, version, timeout)
+        else:
+            self._forget(key, version)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        # Counters are authoritative in L2 only
+        self._forget(key, version)
+        return self.shared.incr(key, delta, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def has_key(self, key, version=None):
+        if self._l1_ttl(key) is not None and self._l1.get(self._l1_key(key, version)) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        self._forget(key, version)
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._forget(key, version)
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self._l1.clear()
+        self.shared.clear()
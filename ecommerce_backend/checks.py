@@ -0,0 +1,75 @@
+"""
+Startup diagnostics for deployments running on a process-local cache.
+
+With LocMemCache every gunicorn worker (and every Celery worker) has its own
+cache: page caches are cold per process, throttle counters are per process
+and generation bumps only reach the process that handled the write. The
+same warning is raised as a system check (manage.py check / runserver /
+migrate) and logged from wsgi.py when gunicorn loads the app.
+"""
+import logging
+import os
+import re
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+logger = logging.getLogger(__name__)
+
+PROCESS_LOCAL_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+_WORKERS_ARG = re.compile(r"(?:^|\s)(?:-w|--workers)[=\s]+(\d+)")
+
+
+def configured_workers() -> int:
+    """Gunicorn worker count from WEB_CONCURRENCY / GUNICORN_CMD_ARGS; 1 when not set."""
+    match = _WORKERS_ARG.search(os.getenv("GUNICORN_CMD_ARGS", ""))
+    raw = match.group(1) if match else os.getenv("WEB_CONCURRENCY", "1")
+    try:
+        return max(int(raw), 1)
+    except ValueError:
+        return 1
+
+
+def shared_cache_backend() -> str:
+    """Backend path of the default cache, looking through TieredCache to its L2."""
+    default = settings.CACHES.get("default", {})
+    backend = default.get("BACKEND", "")
+    if backend == "ecommerce_backend.cache_backends.TieredCache":
+        # Only the L2 behind the in-process tier matters
+        shared = default.get("OPTIONS", {}).get("SHARED", "shared")
+        backend = settings.CACHES.get(shared, {}).get("BACKEND", "")
+    return backend
+
+
+def process_local_cache_message():
+    """Describe the problem, or None when the default cache is shared or we're in DEBUG with one worker."""
+    backend = shared_cache_backend()
+    if backend not in PROCESS_LOCAL_BACKENDS:
+        return None
+    workers = configured_workers()
+    if workers == 1 and settings.DEBUG:
+        return None
+    where = f"{workers} workers" if workers > 1 else "production"
+    return (
+        f"The default cache is process-local ({backend.rsplit('.', 1)[-1]}) in {where}: "
+        "each process keeps its own page cache, throttle counters and invalidation state. "
+        "Set REDIS_URL, or CACHE_BACKEND=sqlite to share a cache file between processes on this host."
+    )
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    message = process_local_cache_message()
+    if message is None:
+        return []
+    return [Warning(message, id="ecommerce_backend.W001")]
+
+
+def warn_if_process_local_cache():
+    message = process_local_cache_message()
+    if message:
+        logger.warning(message)
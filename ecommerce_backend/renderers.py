@@ -0,0 +1,66 @@
+"""
+orjson-backed JSON renderer and parser for DRF.
+
+Drop-in replacements for rest_framework's JSONRenderer / JSONParser that
+produce the same bytes for the API's payloads. orjson walks dicts and lists
+in C and encodes strings, numbers and UUIDs itself. datetime, date and time
+values (passed through with OPT_PASSTHROUGH_DATETIME), Decimal and the other
+types DRF's encoder knows about go through that encoder's `default()`, so
+their formatting (sub-second precision, "Z" suffix, aware-time errors)
+follows the installed DRF rather than orjson's rules. When orjson is not
+installed, or a request needs something only stdlib json does (indentation,
+ensure_ascii, non-strict NaN handling), both classes defer to the DRF
+implementations.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised by patching in tests
+    orjson = None
+
+if orjson is not None:
+    # Dates and times are formatted by DRF's encoder; int dict keys become strings like json.dumps
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+else:
+    ORJSON_OPTIONS = 0
+
+# U+2028/U+2029 in UTF-8; DRF escapes them so responses stay valid JavaScript
+LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+# Dates and times, plus types orjson doesn't handle itself (Decimal, lazy
+# strings, timedelta, querysets, ...) get exactly the value DRF's encoder would produce
+_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
 import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -94,6 +96,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "rest_framework",
     "rest_framework.authtoken",
     "django_filters",
@@ -160,6 +163,16 @@ if os.getenv("DATABASE_URL"):
     DATABASES["default"] = dj_database_url.config(default=os.getenv("DATABASE_URL"))
 
 CACHE_TTL = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+# Stampede protection for catalog_cache_page: how long an expired page may still
+# be served while one worker refreshes it, the refresh lock's TTL, and how long
+# requests wait for another worker's render on a cold miss
+CACHE_STALE_SECONDS = int(os.getenv("CACHE_STALE_SECONDS", "60"))
+CACHE_LOCK_SECONDS = int(os.getenv("CACHE_LOCK_SECONDS", "30"))
+CACHE_LOCK_WAIT_SECONDS = float(os.getenv("CACHE_LOCK_WAIT_SECONDS", "2"))
+# Max staleness of stock figures merged into cached product listings
+STOCK_CACHE_SECONDS = int(os.getenv("STOCK_CACHE_SECONDS", "15"))
+# Per-prefix cache lifetime for /api/products/suggest/
+SUGGEST_CACHE_SECONDS = int(os.getenv("SUGGEST_CACHE_SECONDS", "60"))
 _use_redis_cache = False
 try:
     import django_redis  # type: ignore
@@ -168,6 +181,11 @@ try:
 except Exception:
     _use_redis_cache = False
 
+# "redis" (needs REDIS_URL), "sqlite" (one file shared by all processes on the
+# host) or "locmem" (per process; development only)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis" if _use_redis_cache else ("locmem" if DEBUG else "sqlite"))
+_use_redis_cache = _use_redis_cache and CACHE_BACKEND == "redis"
+
 if _use_redis_cache:
     CACHES = {
         "default": {
@@ -178,6 +196,16 @@ if _use_redis_cache:
             },
         }
     }
+elif CACHE_BACKEND == "sqlite":
+    CACHES = {
+        "default": {
+            "BACKEND": "ecommerce_backend.cache_backends.SQLiteCache",
+            "LOCATION": os.getenv("CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "ecommerce-cache.sqlite3")),
+            "OPTIONS": {
+                "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "20000")),
+            },
+        }
+    }
 else:
     CACHES = {
         "default": {
@@ -186,12 +214,68 @@ else:
         }
     }
 
+# Hot catalog keys are also kept for a few seconds in each worker's memory in
+# front of the shared cache (ecommerce_backend.cache_backends.TieredCache)
+CACHE_L1 = os.getenv("CACHE_L1", "True") == "True"
+if CACHE_BACKEND != "locmem" and CACHE_L1:
+    CACHES = {
+        "default": {
+            "BACKEND": "ecommerce_backend.cache_backends.TieredCache",
+            "LOCATION": "catalog-l1",
+            "OPTIONS": {
+                "SHARED": "shared",
+                "MAX_ENTRIES": int(os.getenv("CACHE_L1_MAX_ENTRIES", "512")),
+            },
+        },
+        "shared": CACHES["default"],
+    }
+# Alias holding the shared backend itself (e.g. for raw Redis access)
+SHARED_CACHE_ALIAS = "shared" if "shared" in CACHES else "default"
+
+# Stock reservations (cart holds): Redis when available; the in-process stand-in
+# only with a process-local cache (development); otherwise holds are off
+RESERVATION_BACKEND = os.getenv(
+    "RESERVATION_BACKEND", "redis" if _use_redis_cache else ("local" if CACHE_BACKEND == "locmem" else "off")
+)
+RESERVATION_HOLD_SECONDS = int(os.getenv("RESERVATION_HOLD_SECONDS", "600"))
+# Per-user caps so one account can't hold a product's whole stock
+RESERVATION_MAX_HOLDS_PER_USER = int(os.getenv("RESERVATION_MAX_HOLDS_PER_USER", "3"))
+RESERVATION_MAX_UNITS_PER_USER = int(os.getenv("RESERVATION_MAX_UNITS_PER_USER", "10"))
+# How long past a hold's expiry its payload and held counters are kept for the sweep
+RESERVATION_GRACE_SECONDS = int(os.getenv("RESERVATION_GRACE_SECONDS", "600"))
+RESERVATION_STOCK_MIRROR_SECONDS = int(os.getenv("RESERVATION_STOCK_MIRROR_SECONDS", "300"))
+
 # Celery
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL or None)
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL or None)
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+CELERY_BEAT_SCHEDULE = {
+    "release-expired-reservations": {
+        "task": "products.tasks.release_expired_reservations",
+        "schedule": float(os.getenv("RESERVATION_SWEEP_SECONDS", "30")),
+    },
+}
+
+# Re-render hot catalog pages after invalidations (products.warmup); needs a Celery broker
+CACHE_WARM_ENABLED = os.getenv("CACHE_WARM_ENABLED", "True" if CELERY_BROKER_URL else "False") == "True"
+CACHE_WARM_DEBOUNCE_SECONDS = int(os.getenv("CACHE_WARM_DEBOUNCE_SECONDS", "10"))
+CACHE_WARM_URLS = [
+    u.strip() for u in os.getenv(
+        "CACHE_WARM_URLS", "/api/products/,/api/products/featured/,/api/categories/,/api/categories/tree/"
+    ).split(",") if u.strip()
+]
+CACHE_WARM_CATEGORY_PAGES = int(os.getenv("CACHE_WARM_CATEGORY_PAGES", "1"))
+CACHE_WARM_CATEGORY_URL = os.getenv("CACHE_WARM_CATEGORY_URL", "/api/products/?category={id}&descendants=true")
+# Page-cache keys include host, scheme and the Vary'd request headers: set these to
+# what the storefront actually sends (CACHE_WARM_HOST = the public API host)
+CACHE_WARM_HOST = os.getenv("CACHE_WARM_HOST", next((h for h in ALLOWED_HOSTS if not h.startswith(("*", "."))), "localhost"))
+CACHE_WARM_SCHEME = os.getenv("CACHE_WARM_SCHEME", "https")
+CACHE_WARM_HEADERS = {
+    "Accept": os.getenv("CACHE_WARM_ACCEPT", "application/json, text/plain, */*"),
+    "Origin": os.getenv("CACHE_WARM_ORIGIN", ""),
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -210,10 +294,37 @@ AUTH_PASSWORD_VALIDATORS = [
     # Removed NumericPasswordValidator to allow numeric PINs
 ]
 
+# Password hashing (see users/hashers.py). PASSWORD_HASHER picks the hasher for
+# new hashes; the others stay listed so older hashes verify and are re-hashed
+# with the preferred one (and its current costs) on the next login.
+PASSWORD_HASHER_CLASSES = {
+    "scrypt": "users.hashers.TunedScryptPasswordHasher",
+    "pbkdf2": "users.hashers.TunedPBKDF2PasswordHasher",
+    "argon2": "users.hashers.TunedArgon2PasswordHasher",
+}
+if importlib.util.find_spec("argon2") is None:
+    PASSWORD_HASHER_CLASSES.pop("argon2")
+_preferred_hasher = os.getenv("PASSWORD_HASHER", "scrypt")
+if _preferred_hasher not in PASSWORD_HASHER_CLASSES:
+    raise RuntimeError(
+        f"PASSWORD_HASHER={_preferred_hasher!r} is not available; choose one of {sorted(PASSWORD_HASHER_CLASSES)}"
+    )
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[_preferred_hasher]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items() if name != _preferred_hasher
+] + ["django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher"]
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "600000"))
+# scrypt n=2**14, r=8 is ~16 MiB and a few tens of ms per login
+PASSWORD_SCRYPT_N = 2 ** int(os.getenv("PASSWORD_SCRYPT_LOG2_N", "14"))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", "2"))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST_KIB", "102400"))
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "1"))
+
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
@@ -223,6 +334,16 @@ REST_FRAMEWORK = {
         "rest_framework.filters.OrderingFilter",
         "rest_framework.filters.SearchFilter",
     ),
+    # orjson-backed JSON; falls back to stdlib json when orjson isn't installed
+    "DEFAULT_RENDERER_CLASSES": (
+        "ecommerce_backend.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "ecommerce_backend.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_PAGINATION_CLASS": "products.pagination.StandardResultsSetPagination",
     "PAGE_SIZE": 12,
@@ -233,9 +354,23 @@ REST_FRAMEWORK = {
     "DEFAULT_THROTTLE_RATES": {
         "anon": os.getenv("DRF_THROTTLE_ANON", "60/min"),
         "user": os.getenv("DRF_THROTTLE_USER", "120/min"),
+        # PIN brute-force limits (users/throttles.py): per account, per phone, per IP
+        "login": os.getenv("DRF_THROTTLE_LOGIN", "20/hour"),
+        "reset_pin": os.getenv("DRF_THROTTLE_RESET_PIN", "5/hour"),
+        "auth_ip": os.getenv("DRF_THROTTLE_AUTH_IP", "30/min"),
+        # Creating/releasing cart holds, per user
+        "reservations": os.getenv("DRF_THROTTLE_RESERVATIONS", "30/hour"),
     },
 }
 
+# How long CachedJWTAuthentication may reuse a user row (dropped on every User save)
+AUTH_USER_CACHE_SECONDS = int(os.getenv("AUTH_USER_CACHE_SECONDS", "300"))
+
+# Google sign-in: where ID-token signing keys come from (https URL, or a path to a
+# JWKS file) and how long to keep them when the source sends no max-age
+GOOGLE_JWKS_SOURCE = os.getenv("GOOGLE_JWKS_SOURCE", "https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_JWKS_DEFAULT_MAX_AGE = int(os.getenv("GOOGLE_JWKS_DEFAULT_MAX_AGE", "3600"))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=int(os.getenv("ACCESS_TOKEN_MINUTES", "60"))),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=int(os.getenv("REFRESH_TOKEN_DAYS", "7"))),
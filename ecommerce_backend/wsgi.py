@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
 
 application = get_wsgi_application()
+
+# System checks don't run under gunicorn; surface the cache warning here
+from ecommerce_backend.checks import warn_if_process_local_cache  # noqa: E402
+
+warn_if_process_local_cache()
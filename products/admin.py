@@ -1,29 +1,76 @@
 from django.contrib import admin
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from .models import Category, Product, ProductImage, Order, OrderItem, ContactMessage
 
 
 class OrderItemInline(admin.TabularInline): 
     model = OrderItem
     extra = 1
+    fields = ("product", "quantity", "unit_price")
+    readonly_fields = ("unit_price",)
+    # Search box instead of a <select> holding every product
+    autocomplete_fields = ("product",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("product")
 
 
 class OrderAdmin(admin.ModelAdmin):
+    # total_amount is a stored column (see backfill_order_totals), so the
+    # changelist needs no per-row item queries
     list_display = ("id", "user", "status", "created_at", "total_amount")
     list_filter = ("status", "created_at")
+    list_select_related = ("user",)
     search_fields = ("user__username", "user__email")
+    # Recomputed from the items in save_related()
+    readonly_fields = ("total_amount", "item_count")
     inlines = [OrderItemInline]
 
-    def total_amount(self, obj):
-        return sum(item.product.price * item.quantity for item in obj.items.all())
-    total_amount.short_description = "Total Amount"
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        order = form.instance
+        # New rows and rows switched to another product take the current price,
+        # as OrderSerializer.create does; then the stored totals are recomputed
+        repriced = [
+            item_form.instance.pk
+            for formset in formsets if formset.model is OrderItem
+            for item_form in formset.forms
+            if item_form.instance.pk and "product" in item_form.changed_data
+        ]
+        OrderItem.objects.filter(Q(pk__in=repriced) | Q(unit_price__isnull=True), order=order).update(
+            unit_price=Subquery(Product.objects.filter(pk=OuterRef("product_id")).values("price")[:1])
+        )
+        totals = OrderItem.objects.filter(order=order).aggregate(
+            total=Sum(F("quantity") * F("unit_price"), output_field=DecimalField(max_digits=12, decimal_places=2)),
+            count=Count("id"),
+        )
+        order.total_amount = totals["total"] or Decimal("0")
+        order.item_count = totals["count"]
+        Order.objects.filter(pk=order.pk).update(total_amount=order.total_amount, item_count=order.item_count)
 
 
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ("id", "order", "product", "quantity", "item_total")
+    list_select_related = ("order", "product")
+    raw_id_fields = ("order",)
+    autocomplete_fields = ("product",)
+
+    def get_queryset(self, request):
+        # Line total in SQL; legacy rows without a price snapshot use the live price
+        return super().get_queryset(request).annotate(
+            line_total=ExpressionWrapper(
+                F("quantity") * Coalesce("unit_price", "product__price"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
 
     def item_total(self, obj):
-        return obj.product.price * obj.quantity
+        return obj.line_total
     item_total.short_description = "Item Total"
+    item_total.admin_order_field = "line_total"
 
 
 @admin.register(Category)
@@ -8,3 +8,5 @@ class ProductsConfig(AppConfig):
     def ready(self):
         # Import signals to connect handlers
         from . import signals  # noqa: F401
+        # Shared-cache deployment check (the catalog cache relies on it)
+        from ecommerce_backend import checks  # noqa: F401
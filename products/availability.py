@@ -0,0 +1,77 @@
+"""
+Live stock levels kept outside the cached catalog pages.
+
+Product listings are cached for CACHE_TTL, but stock moves with every order.
+Instead of evicting whole listings on each sale, stock is read through short
+per-product keys (STOCK_CACHE_SECONDS) and merged into cached responses after
+the page cache lookup.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from ecommerce_backend.renderers import FastJSONRenderer
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+STOCK_KEY = "catalog:stock:{}"
+
+
+def _stock_ttl() -> int:
+    return getattr(settings, "STOCK_CACHE_SECONDS", 15)
+
+
+def get_stock_levels(product_ids) -> dict:
+    """Return {product_id: stock}, at most STOCK_CACHE_SECONDS stale."""
+    ids = {int(pid) for pid in product_ids}
+    if not ids:
+        return {}
+    keys = {STOCK_KEY.format(pid): pid for pid in ids}
+    try:
+        found = cache.get_many(list(keys))
+    except Exception:
+        found = {}
+    levels = {keys[k]: v for k, v in found.items()}
+    missing = ids - levels.keys()
+    if missing:
+        fresh = dict(Product.objects.filter(id__in=missing).values_list("id", "stock"))
+        levels.update(fresh)
+        try:
+            cache.set_many({STOCK_KEY.format(pid): stock for pid, stock in fresh.items()}, _stock_ttl())
+        except Exception:
+            pass
+    return levels
+
+
+def forget_stock(product_ids) -> None:
+    try:
+        cache.delete_many([STOCK_KEY.format(pid) for pid in product_ids])
+    except Exception:
+        pass
+
+
+def overlay_stock(response):
+    """Replace `stock` in a cached product listing with live values."""
+    data = getattr(response, "data", None)
+    if data is None or not response.get("Content-Type", "").startswith("application/json"):
+        return response
+    rows = data.get("results", []) if isinstance(data, dict) else data
+    rows = [row for row in rows if isinstance(row, dict) and "id" in row and "stock" in row]
+    if not rows:
+        return response
+    try:
+        levels = get_stock_levels(row["id"] for row in rows)
+    except Exception:
+        logger.warning("Could not load live stock levels", exc_info=True)
+        return response
+    changed = False
+    for row in rows:
+        stock = levels.get(row["id"], row["stock"])
+        if stock != row["stock"]:
+            row["stock"] = stock
+            changed = True
+    if changed:
+        response.content = FastJSONRenderer().render(data)
+    return response
@@ -0,0 +1,209 @@
+"""
+Catalog page caching keyed by generation counters.
+
+Every cached catalog page is stored under a key prefix built from one or more
+generation counters ("products", "categories"). Bumping a counter is a single
+INCR, after which lookups compute a new prefix and the old entries are simply
+never read again and age out on their TTL. Nothing else sharing the cache
+(throttle counters, sessions, ...) is touched.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (
+    get_cache_key,
+    has_vary_header,
+    learn_cache_key,
+    patch_response_headers,
+)
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS = "products"
+CATEGORIES = "categories"
+
+GENERATION_KEY = "catalog:gen:{}"
+
+
+def generation_key(namespace: str) -> str:
+    return GENERATION_KEY.format(namespace)
+
+
+def _seed() -> int:
+    # Seed missing counters from the clock so a counter that was evicted and
+    # recreated can never land back on a value older pages were cached under.
+    return int(time.time() * 1000)
+
+
+def get_generations(namespaces) -> dict:
+    keys = {generation_key(ns): ns for ns in namespaces}
+    found = cache.get_many(list(keys))
+    for key, ns in keys.items():
+        if key not in found:
+            cache.add(key, _seed(), timeout=None)
+            found[key] = cache.get(key)
+    return {ns: found[key] for key, ns in keys.items()}
+
+
+def bump_generation(namespace: str) -> None:
+    key = generation_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Counter missing (first bump or evicted): start a fresh one
+        if not cache.add(key, _seed(), timeout=None):
+            cache.incr(key)
+
+
+def versioned_prefix(namespaces) -> str:
+    gens = get_generations(namespaces)
+    return "catalog:" + ".".join(f"{ns}{gens[ns]}" for ns in namespaces)
+
+
+def cached_bytes(namespaces, name, build, timeout=24 * 60 * 60):
+    """
+    Return (etag, body) for `build()` -> bytes, cached under the current
+    generations of `namespaces`. The ETag is a strong hash of the body.
+    """
+    key = f"{versioned_prefix(namespaces)}:{name}"
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    body = build()
+    etag = '"%s"' % hashlib.md5(body, usedforsecurity=False).hexdigest()
+    cache.set(key, (etag, body), timeout)
+    return etag, body
+
+
+def _stale_seconds() -> int:
+    return getattr(settings, "CACHE_STALE_SECONDS", 60)
+
+
+def _lock_key(request, key_prefix) -> str:
+    url = hashlib.md5(request.build_absolute_uri().encode(), usedforsecurity=False).hexdigest()
+    return f"{key_prefix}:lock:{url}"
+
+
+def _lookup(request, key_prefix):
+    """(fresh_until, response) for the cached page, or (None, None)."""
+    cache_key = get_cache_key(request, key_prefix, "GET", cache=cache)
+    entry = cache.get(cache_key) if cache_key else None
+    if entry is None:
+        return None, None
+    if not isinstance(entry, tuple):
+        return 0, entry  # bare response from before soft TTLs: refresh it
+    return entry
+
+
+def _store(request, response, timeout, key_prefix):
+    # Same admission rules as django.middleware.cache.UpdateCacheMiddleware
+    if response.streaming or response.status_code != 200:
+        return
+    if not request.COOKIES and response.cookies and has_vary_header(response, "Cookie"):
+        return
+    if "private" in response.get("Cache-Control", ()):
+        return
+    patch_response_headers(response, timeout)
+    # Kept past its soft TTL so it can be served stale while one worker refreshes it
+    hard_timeout = timeout + _stale_seconds()
+    cache_key = learn_cache_key(request, response, hard_timeout, key_prefix, cache=cache)
+    fresh_until = time.time() + timeout
+    if hasattr(response, "render") and callable(response.render):
+        response.add_post_render_callback(lambda r: cache.set(cache_key, (fresh_until, r), hard_timeout))
+    else:
+        cache.set(cache_key, (fresh_until, response), hard_timeout)
+
+
+def catalog_cache_page(timeout, namespaces=(PRODUCTS,), on_hit=None):
+    """
+    Drop-in replacement for cache_page whose entries are invalidated by
+    bumping any of the given generation namespaces.
+
+    Stampede protection, shared by all workers through the cache: after
+    `timeout` an entry is stale for CACHE_STALE_SECONDS more; the first
+    request to see it stale takes a per-URL lock (cache.add) and re-renders
+    while everyone else keeps getting the stale copy. On a plain miss the
+    lock holder renders and other requests wait up to
+    CACHE_LOCK_WAIT_SECONDS for its result before rendering themselves.
+
+    `on_hit(response)` may patch volatile fields into a cached response.
+    """
+    namespaces = tuple(namespaces)
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view_func(request, *args, **kwargs)
+            try:
+                key_prefix = versioned_prefix(namespaces)
+                fresh_until, response = _lookup(request, key_prefix)
+            except Exception:
+                logger.warning("Catalog cache unavailable; serving %s uncached", request.path, exc_info=True)
+                return view_func(request, *args, **kwargs)
+
+            if response is not None and fresh_until > time.time():
+                return on_hit(response) if on_hit else response
+
+            lock_key = _lock_key(request, key_prefix)
+            locked = _acquire(lock_key)
+            if not locked:
+                if response is not None:
+                    # Someone else is refreshing: the stale copy will do
+                    return on_hit(response) if on_hit else response
+                response = _wait_for(request, key_prefix)
+                if response is not None:
+                    return on_hit(response) if on_hit else response
+            try:
+                response = view_func(request, *args, **kwargs)
+                if request.method == "GET":
+                    try:
+                        _store(request, response, timeout, key_prefix)
+                    except Exception:
+                        logger.warning("Failed to cache %s", request.path, exc_info=True)
+            finally:
+                if locked:
+                    _release(lock_key, response)
+            return response
+
+        return _wrapped
+
+    return decorator
+
+
+def _acquire(lock_key) -> bool:
+    try:
+        return cache.add(lock_key, 1, getattr(settings, "CACHE_LOCK_SECONDS", 30))
+    except Exception:
+        return True  # no shared lock available: behave like a plain cache
+
+
+def _release(lock_key, response):
+    def release(*args):
+        try:
+            cache.delete(lock_key)
+        except Exception:
+            pass
+
+    # The entry is written after rendering; hold the lock until then
+    if hasattr(response, "render") and callable(response.render) and not getattr(response, "is_rendered", True):
+        response.add_post_render_callback(release)
+    else:
+        release()
+
+
+def _wait_for(request, key_prefix):
+    deadline = time.time() + getattr(settings, "CACHE_LOCK_WAIT_SECONDS", 2)
+    while time.time() < deadline:
+        time.sleep(0.05)
+        try:
+            _, response = _lookup(request, key_prefix)
+        except Exception:
+            return None
+        if response is not None:
+            return response
+    return None
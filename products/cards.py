@@ -0,0 +1,99 @@
+"""
+Product cards for listings, built from `.values()` rows.
+
+Produces the same JSON shape as ProductSerializer for read-only listings but
+skips DRF's per-field machinery and model instantiation: one query for the
+product rows (category columns joined in), one for their images, and a
+single row builder that assembles each card with one dict literal.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .images import image_variants
+from .models import ProductImage
+
+# values() lookups: product columns, then the joined category columns
+PRODUCT_COLUMNS = (
+    "id", "title", "description", "price", "stock", "image_url",
+    "is_featured", "category_id", "created_at", "updated_at",
+)
+CATEGORY_COLUMNS = ("category__name", "category__parent_id", "category__created_at")
+
+CENT = Decimal("0.01")
+
+
+def format_decimal(value):
+    # DecimalField(max_digits=10, decimal_places=2) with COERCE_DECIMAL_TO_STRING
+    return None if value is None else str(value.quantize(CENT))
+
+
+def format_datetime(value):
+    # Same output as serializers.DateTimeField: current timezone, "Z" for UTC
+    if value is None:
+        return None
+    value = timezone.localtime(value) if timezone.is_aware(value) else value
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def compile_row_builder():
+    """Return row(values_dict, images) -> card dict, in ProductSerializer field order."""
+    fmt_decimal, fmt_dt, variants = format_decimal, format_datetime, image_variants
+
+    def row(r, images):
+        image_url = r["image_url"]
+        if not images and image_url:
+            images = [variants(image_url)]
+        return {
+            "id": r["id"],
+            "title": r["title"],
+            "description": r["description"],
+            "price": fmt_decimal(r["price"]),
+            "stock": r["stock"],
+            "image_url": image_url,
+            "is_featured": r["is_featured"],
+            "category": {
+                "id": r["category_id"],
+                "name": r["category__name"],
+                "parent": r["category__parent_id"],
+                "created_at": fmt_dt(r["category__created_at"]),
+            },
+            "images": images,
+            "created_at": fmt_dt(r["created_at"]),
+            "updated_at": fmt_dt(r["updated_at"]),
+        }
+
+    return row
+
+
+build_card = compile_row_builder()
+
+
+def card_rows(queryset):
+    """Narrow a Product queryset to the dicts build_card() expects."""
+    return queryset.values(*PRODUCT_COLUMNS, *CATEGORY_COLUMNS)
+
+
+def images_by_product(product_ids) -> dict:
+    grouped = defaultdict(list)
+    rows = (
+        ProductImage.objects.filter(product_id__in=product_ids)
+        .order_by("sort_order", "id")
+        .values_list("product_id", "url", "variants")
+    )
+    for product_id, url, stored in rows:
+        grouped[product_id].append(stored or image_variants(url))
+    return grouped
+
+
+def build_cards(rows) -> list:
+    """Card dicts for an evaluated list of card_rows() dicts."""
+    rows = list(rows)
+    if not rows:
+        return []
+    images = images_by_product([r["id"] for r in rows])
+    return [build_card(r, images.get(r["id"], [])) for r in rows]
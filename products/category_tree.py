@@ -0,0 +1,70 @@
+"""Helpers for the materialized category tree (Category.path / Category.depth)."""
+
+
+def compute_category_paths(parent_by_id: dict) -> dict:
+    """
+    Map {category_id: parent_id or None} to {category_id: (path, depth)}.
+
+    Rows caught in a parent cycle, or pointing at a missing parent, are
+    treated as roots so a rebuild always terminates.
+    """
+    result = {}
+    for start in parent_by_id:
+        chain = []
+        seen = set()
+        node = start
+        while node is not None and node not in result and node not in seen:
+            seen.add(node)
+            chain.append(node)
+            parent = parent_by_id.get(node)
+            node = parent if parent in parent_by_id else None
+        base_path, base_depth = result.get(node, ("/", -1))
+        for cid in reversed(chain):
+            base_path, base_depth = f"{base_path}{cid}/", base_depth + 1
+            result[cid] = (base_path, base_depth)
+    return result
+
+
+def rebuild_category_paths(category_model, batch_size=500) -> int:
+    """Recompute path/depth for every row of `category_model`; returns rows changed."""
+    rows = list(category_model.objects.only("id", "parent_id", "path", "depth"))
+    paths = compute_category_paths({row.id: row.parent_id for row in rows})
+    changed = []
+    for row in rows:
+        path, depth = paths[row.id]
+        if (row.path, row.depth) != (path, depth):
+            row.path, row.depth = path, depth
+            changed.append(row)
+    category_model.objects.bulk_update(changed, ["path", "depth"], batch_size=batch_size)
+    return len(changed)
+
+
+def build_category_tree(rows) -> list:
+    """
+    Nest flat category rows (dicts with id/name/parent_id/created_at, already
+    ordered by name) into the CategorySerializer shape plus `children`.
+    """
+    from rest_framework import serializers
+
+    to_datetime = serializers.DateTimeField().to_representation
+    nodes = {}
+    for row in rows:
+        nodes[row["id"]] = {
+            "id": row["id"],
+            "name": row["name"],
+            "parent": row["parent_id"],
+            "children_count": 0,
+            "has_children": False,
+            "created_at": to_datetime(row["created_at"]),
+            "children": [],
+        }
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent"])
+        if parent is None:
+            roots.append(node)
+            continue
+        parent["children"].append(node)
+        parent["children_count"] += 1
+        parent["has_children"] = True
+    return roots
@@ -0,0 +1,55 @@
+"""
+Validators for conditional GETs on catalog resources.
+
+Used with django.views.decorators.http.condition so If-None-Match /
+If-Modified-Since are answered before the view queries or serializes
+anything. Each representation (path, query string, Accept) gets its own
+strong ETag:
+
+- product detail: one indexed lookup of the product's (updated_at, stock)
+  and its category's updated_at, plus the categories generation, since the
+  payload embeds the category. Last-Modified is the later of the two
+  timestamps, so a category rename can't be answered with a stale 304.
+- category list/detail: the categories generation alone, no DB access.
+"""
+import hashlib
+
+from .cache import CATEGORIES, get_generations
+from .models import Product
+
+_STATE_ATTR = "_product_condition_state"
+
+
+def _etag(request, *parts) -> str:
+    raw = "|".join(str(p) for p in (request.get_full_path(), request.META.get("HTTP_ACCEPT", ""), *parts))
+    return '"%s"' % hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def _product_state(request, pk):
+    # condition() asks for the ETag and Last-Modified separately; look up once
+    state = getattr(request, _STATE_ATTR, None)
+    if state is None:
+        try:
+            row = Product.objects.filter(pk=pk).values_list("updated_at", "stock", "category__updated_at").first()
+        except (TypeError, ValueError):
+            row = None
+        state = (row, get_generations((CATEGORIES,))[CATEGORIES] if row else None)
+        setattr(request, _STATE_ATTR, state)
+    return state
+
+
+def product_etag(request, pk=None, **kwargs):
+    row, categories_gen = _product_state(request, pk)
+    if row is None:
+        return None  # let the view answer 404
+    updated_at, stock, category_updated_at = row
+    return _etag(request, pk, updated_at.isoformat(), stock, category_updated_at.isoformat(), categories_gen)
+
+
+def product_last_modified(request, pk=None, **kwargs):
+    row, _ = _product_state(request, pk)
+    return max(row[0], row[2]) if row else None
+
+
+def category_etag(request, *args, **kwargs):
+    return _etag(request, get_generations((CATEGORIES,))[CATEGORIES])
@@ -1,7 +1,14 @@
 import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
 from .models import Product, Category
 
+# Must match the config used by the search_vector trigger (migration 0014)
+SEARCH_CONFIG = "english"
+
 class ProductFilter(filters.FilterSet):
     price_min = filters.NumberFilter(field_name="price", lookup_expr="gte")
     price_max = filters.NumberFilter(field_name="price", lookup_expr="lte")
@@ -31,18 +38,31 @@ class ProductFilter(filters.FilterSet):
         if request is not None:
             descendants_param = request.query_params.get('descendants')
         if descendants_param and str(descendants_param).lower() in {"1", "true", "yes"}:
-            # BFS to collect all descendant ids including the root
-            to_visit = [cid]
-            seen = set()
-            all_ids = set()
-            while to_visit:
-                current = to_visit.pop(0)
-                if current in seen:
-                    continue
-                seen.add(current)
-                all_ids.add(current)
-                children = list(Category.objects.filter(parent_id=current).values_list('id', flat=True))
-                to_visit.extend(children)
-            return queryset.filter(category_id__in=list(all_ids))
+            # Subtree via the materialized path: one indexed prefix match
+            root_path = Category.objects.filter(pk=cid).values_list("path", flat=True).first()
+            if root_path:
+                return queryset.filter(category__path__startswith=root_path)
         # default: exact match
         return queryset.filter(category_id=cid)
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    ?search= backed by Product.search_vector on PostgreSQL: websearch syntax,
+    GIN index lookup and rank ordering (unless ?ordering= is given).
+    Other databases keep DRF's icontains search over `search_fields`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+        terms = request.query_params.get(self.search_param, "").replace("\x00", "").strip()
+        if not terms:
+            return queryset
+        query = SearchQuery(terms, search_type="websearch", config=SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query)
+        if not request.query_params.get("ordering"):
+            queryset = queryset.annotate(search_rank=SearchRank(F("search_vector"), query)).order_by(
+                "-search_rank", "-created_at", "id"
+            )
+        return queryset
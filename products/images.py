@@ -0,0 +1,32 @@
+"""Cloudinary delivery URL variants for product images."""
+from functools import lru_cache
+
+# Variant name -> Cloudinary transformation inserted after '/upload/'
+CLOUDINARY_VARIANTS = {
+    "tiny": "f_auto,q_auto:low,c_limit,dpr_auto,w_120",
+    "thumb": "f_auto,q_auto:eco,c_limit,dpr_auto,w_240",
+    "medium": "f_auto,q_auto,c_limit,dpr_auto,w_800",
+    "full": "f_auto,q_auto,c_limit,dpr_auto,w_1600",
+    "hero": "f_auto,q_auto:best,c_limit,dpr_auto,w_3000",
+}
+
+UPLOAD_MARKER = "/upload/"
+
+
+def cloudinary_variant(url: str, transform: str) -> str:
+    # Insert Cloudinary transform after '/upload/' if present; otherwise return original URL
+    idx = url.find(UPLOAD_MARKER)
+    if idx == -1:
+        return url
+    cut = idx + len(UPLOAD_MARKER)
+    return f"{url[:cut]}{transform}/{url[cut:]}"
+
+
+@lru_cache(maxsize=4096)
+def _variants(url: str) -> tuple:
+    return (("orig", url),) + tuple((name, cloudinary_variant(url, t)) for name, t in CLOUDINARY_VARIANTS.items())
+
+
+def image_variants(url: str) -> dict:
+    """{"orig", "tiny", "thumb", "medium", "full", "hero"} URLs for `url`, memoized per URL."""
+    return dict(_variants(url or ""))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from products.models import ProductImage
+from products.images import image_variants
+from products.cache import PRODUCTS, bump_generation
+
+
+class Command(BaseCommand):
+    help = "Store precomputed Cloudinary variant URLs on ProductImage rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Recompute every row (e.g. after changing CLOUDINARY_VARIANTS).")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        qs = ProductImage.objects.only("id", "url", "variants").order_by("id")
+        if not options["all"]:
+            qs = qs.filter(variants={})
+        batch, updated = [], 0
+        for image in qs.iterator(chunk_size=options["batch_size"]):
+            variants = image_variants(image.url)
+            if image.variants != variants:
+                image.variants = variants
+                batch.append(image)
+            if len(batch) >= options["batch_size"]:
+                updated += len(batch)
+                ProductImage.objects.bulk_update(batch, ["variants"])
+                batch = []
+        if batch:
+            updated += len(batch)
+            ProductImage.objects.bulk_update(batch, ["variants"])
+        if updated:
+            bump_generation(PRODUCTS)
+        self.stdout.write(self.style.SUCCESS(f"Image variants backfilled. Rows updated: {updated}"))
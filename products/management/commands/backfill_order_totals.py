@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from products.models import Order, OrderItem, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill OrderItem.unit_price for items created before price snapshots "
+        "(from the current product price) and recompute Order.total_amount/item_count."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute totals for every order, not only orders that were never filled.",
+        )
+
+    def handle(self, *args, **options):
+        money = DecimalField(max_digits=12, decimal_places=2)
+        items_of_order = OrderItem.objects.filter(order=OuterRef("pk")).order_by().values("order")
+        totals = items_of_order.annotate(total=Sum(F("quantity") * F("unit_price"), output_field=money)).values("total")
+        counts = items_of_order.annotate(n=Count("id")).values("n")
+
+        total_of_order = Coalesce(Subquery(totals, output_field=money), Value(Decimal("0")), output_field=money)
+        count_of_order = Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+        with transaction.atomic():
+            orders = Order.objects.all()
+            if not options["all"]:
+                # Evaluated before the items are priced below, so orders with
+                # unpriced items still match; orders whose stored totals
+                # disagree with their (already priced) items are picked up too
+                order_ids = list(
+                    orders.annotate(actual_total=total_of_order, actual_count=count_of_order)
+                    .filter(
+                        Q(items__unit_price__isnull=True)
+                        | ~Q(item_count=F("actual_count"))
+                        | ~Q(total_amount=F("actual_total"))
+                    )
+                    .values_list("pk", flat=True)
+                    .distinct()
+                )
+                orders = orders.filter(pk__in=order_ids)
+
+            items_updated = OrderItem.objects.filter(unit_price__isnull=True).update(
+                unit_price=Subquery(Product.objects.filter(pk=OuterRef("product_id")).values("price")[:1])
+            )
+            orders_updated = orders.update(total_amount=total_of_order, item_count=count_of_order)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfill complete. Items priced: {items_updated}, Orders updated: {orders_updated}"
+        ))
@@ -0,0 +1,82 @@
+import datetime
+import decimal
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from ecommerce_backend import renderers
+from ecommerce_backend.renderers import FastJSONRenderer
+from products.images import image_variants
+
+
+def product_page(size):
+    # Shape of one /api/products/ page as ProductSerializer emits it
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {
+        "count": 1000,
+        "next": "https://example.com/api/products/?page=2",
+        "previous": None,
+        "results": [
+            {
+                "id": i,
+                "title": f"Frame {i}",
+                "description": "Acetate frame with spring hinges. " * 4,
+                "price": f"{100 + i}.99",
+                "stock": i % 7,
+                "image_url": "",
+                "is_featured": i % 5 == 0,
+                "category": {"id": 3, "name": "Optical", "parent": 1, "created_at": now.isoformat()},
+                "images": [image_variants(f"https://res.cloudinary.com/demo/image/upload/v1/{i}_{n}.jpg") for n in range(3)],
+                "created_at": now.isoformat(),
+                "updated_at": now.isoformat(),
+            }
+            for i in range(size)
+        ],
+    }
+
+
+def order_page(size):
+    # Order history with native Decimal / datetime / UUID values, as built by hand in views and tasks
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {
+        "next": None,
+        "results": [
+            {
+                "id": i,
+                "reference": uuid.uuid4(),
+                "status": "PAID",
+                "total_amount": decimal.Decimal("349.97"),
+                "item_count": 3,
+                "created_at": now - datetime.timedelta(days=i),
+                "items": [
+                    {"id": i * 10 + n, "quantity": 1, "unit_price": decimal.Decimal("116.99"), "product": {"id": n, "title": f"Frame {n}"}}
+                    for n in range(3)
+                ],
+            }
+            for i in range(size)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSONRenderer with FastJSONRenderer on product and order payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=24, help="Rows per payload.")
+        parser.add_argument("--repeat", type=int, default=500)
+
+    def handle(self, *args, **options):
+        size, repeat = options["size"], options["repeat"]
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed; FastJSONRenderer falls back to stdlib json."))
+        candidates = (("drf", JSONRenderer()), ("fast", FastJSONRenderer()))
+        for label, data in (("products", product_page(size)), ("orders", order_page(size))):
+            for name, renderer in candidates:
+                renderer.render(data)
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    body = renderer.render(data)
+                elapsed = (time.perf_counter() - start) / repeat * 1e6
+                self.stdout.write(f"{label:<9} {name:<5} {elapsed:9.1f} us/payload  {len(body)} bytes")
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.cards import build_cards, card_rows
+from products.models import Product
+from products.serializers import ProductSerializer
+from products.views import PRODUCT_READ_PLAN, product_images_prefetch
+
+
+class Command(BaseCommand):
+    help = "Compare ProductSerializer against the .values() card builder on the current catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=100, help="Products per page.")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        limit, repeat = options["limit"], options["repeat"]
+        base = Product.objects.defer("search_vector").order_by("-created_at", "id")[:limit]
+        rows = base.count()
+        if not rows:
+            self.stdout.write(self.style.WARNING("No products to benchmark; run seed_store first."))
+            return
+
+        def serializer():
+            qs = base.select_related(*PRODUCT_READ_PLAN["select_related"]).prefetch_related(product_images_prefetch())
+            return ProductSerializer(list(qs), many=True).data
+
+        def cards():
+            return build_cards(card_rows(base))
+
+        for name, fn in (("serializer", serializer), ("cards", cards)):
+            fn()  # warm up connections and the variant memo
+            start = time.perf_counter()
+            for _ in range(repeat):
+                fn()
+            per_row = (time.perf_counter() - start) / (repeat * rows) * 1e6
+            self.stdout.write(f"{name:<10} {per_row:8.1f} us/row  ({rows} rows x {repeat})")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from products.models import Category
+from products.category_tree import rebuild_category_paths
+from products.cache import CATEGORIES, PRODUCTS, bump_generation
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialized Category.path/depth columns for all categories."
+
+    def handle(self, *args, **options):
+        changed = rebuild_category_paths(Category)
+        if changed:
+            bump_generation(CATEGORIES)
+            bump_generation(PRODUCTS)
+        self.stdout.write(self.style.SUCCESS(f"Category tree rebuilt. Rows updated: {changed}"))
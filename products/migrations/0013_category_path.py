@@ -0,0 +1,53 @@
+# Generated by Django 4.2.24 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    # Frozen copy of products.category_tree.rebuild_category_paths as of this migration
+    Category = apps.get_model("products", "Category")
+    rows = list(Category.objects.only("id", "parent_id", "path", "depth"))
+    parent_by_id = {row.id: row.parent_id for row in rows}
+    paths = {}
+    for start in parent_by_id:
+        chain = []
+        seen = set()
+        node = start
+        while node is not None and node not in paths and node not in seen:
+            seen.add(node)
+            chain.append(node)
+            parent = parent_by_id.get(node)
+            # Cycles and dangling parents are treated as roots
+            node = parent if parent in parent_by_id else None
+        base_path, base_depth = paths.get(node, ("/", -1))
+        for cid in reversed(chain):
+            base_path, base_depth = f"{base_path}{cid}/", base_depth + 1
+            paths[cid] = (base_path, base_depth)
+    for row in rows:
+        row.path, row.depth = paths[row.id]
+    Category.objects.bulk_update(rows, ["path", "depth"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_alter_order_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=512),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.24 on 2026-10-18 10:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Keep the text search config in sync with products.filters.SEARCH_CONFIG
+FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION products_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER products_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, search_vector ON products_product
+    FOR EACH ROW EXECUTE FUNCTION products_product_search_vector_update();
+    """,
+    "UPDATE products_product SET title = title;",
+    "CREATE INDEX products_product_search_vector_gin ON products_product USING gin (search_vector);",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS products_product_search_vector_gin;",
+    "DROP TRIGGER IF EXISTS products_product_search_vector_trigger ON products_product;",
+    "DROP FUNCTION IF EXISTS products_product_search_vector_update();",
+]
+
+
+def _run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_category_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(_run_on_postgres(FORWARD_SQL), _run_on_postgres(REVERSE_SQL)),
+    ]
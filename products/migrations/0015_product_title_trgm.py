@@ -0,0 +1,27 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+def _run_on_postgres(sql):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_product_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(
+            _run_on_postgres(
+                "CREATE INDEX IF NOT EXISTS products_product_title_trgm "
+                "ON products_product USING gin (title gin_trgm_ops);"
+            ),
+            _run_on_postgres("DROP INDEX IF EXISTS products_product_title_trgm;"),
+        ),
+    ]
@@ -1,5 +1,10 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from .images import image_variants
 
 class Category(models.Model):
     name = models.CharField(max_length=120)
@@ -12,6 +17,12 @@ class Category(models.Model):
         db_index=True,
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Product detail embeds its category, so this feeds the product's Last-Modified too
+    updated_at = models.DateTimeField(auto_now=True)
+    # Materialized ancestry: "/<root id>/.../<own id>/". A subtree is every row
+    # whose path starts with the root's path; maintained by save().
+    path = models.CharField(max_length=512, blank=True, default="", editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["name"]
@@ -21,11 +32,46 @@ class Category(models.Model):
         indexes = [
             models.Index(fields=["name"]),
             models.Index(fields=["parent", "name"]),
+            models.Index(fields=["path"], name="category_path_idx", opclasses=["varchar_pattern_ops"]),
         ]
 
     def __str__(self):
         return f"{self.parent} > {self.name}" if self.parent else self.name
 
+    def _check_parent(self):
+        # Backstop for admin/clean() and direct saves; the API validates in CategorySerializer
+        if self.pk and self.parent_id:
+            if self.parent_id == self.pk or (self.path and self.parent.path.startswith(self.path)):
+                raise ValidationError({"parent": "A category cannot be moved under itself or its descendants."})
+
+    def clean(self):
+        super().clean()
+        self._check_parent()
+
+    def save(self, *args, **kwargs):
+        self._check_parent()
+        old_path = self.path
+        super().save(*args, **kwargs)
+        parent_path = self.parent.path if self.parent_id else "/"
+        new_path = f"{parent_path}{self.pk}/"
+        if new_path == old_path:
+            return
+        new_depth = new_path.count("/") - 2
+        Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+        if old_path:
+            # Moved: rewrite the whole subtree's prefix in one statement
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr("path", len(old_path) + 1), output_field=models.CharField()),
+                depth=F("depth") + (new_depth - self.depth),
+            )
+        self.path, self.depth = new_path, new_depth
+
+    def get_descendant_ids(self, include_self=True):
+        qs = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            qs = qs.exclude(pk=self.pk)
+        return qs.values_list("id", flat=True)
+
 
 class Product(models.Model):
     title = models.CharField(max_length=255)
@@ -37,6 +83,9 @@ class Product(models.Model):
     is_featured = models.BooleanField(default=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Weighted title/description tsvector, maintained by a Postgres trigger
+    # (migration 0014) together with its GIN index. Unused on other backends.
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
@@ -44,17 +93,61 @@ class Product(models.Model):
             models.Index(fields=["category"]),
             models.Index(fields=["price"]),
             models.Index(fields=["created_at"]),
+            # Keyset pagination (products.pagination.ProductKeysetPagination)
+            models.Index(fields=["-created_at", "id"], name="product_created_id_idx"),
+            models.Index(fields=["price", "id"], name="product_price_id_idx"),
         ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _snapshot(self, fields=None):
+        """Record the current values of `fields` (all loaded fields when None) as the DB state."""
+        deferred = self.get_deferred_fields()
+        if fields is None:
+            names = [f.attname for f in self._meta.concrete_fields]
+            loaded = {}
+        else:
+            names = [self._meta.get_field(name).attname for name in fields]
+            loaded = dict(getattr(self, "_loaded_values", None) or {})
+        loaded.update((name, getattr(self, name)) for name in names if name not in deferred)
+        self._loaded_values = loaded
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self._snapshot()
+        elif getattr(self, "_loaded_values", None) is not None:
+            # Only the written columns now match the DB
+            self._snapshot(update_fields)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or getattr(self, "_loaded_values", None) is not None:
+            self._snapshot(fields)
+
+    def changed_fields(self):
+        """Attnames that differ from the values loaded from the DB, or None for new instances."""
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return None
+        return {name for name, value in loaded.items() if getattr(self, name) != value}
+
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, related_name="images", on_delete=models.CASCADE, db_index=True)
     url = models.URLField()
     sort_order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Precomputed delivery URLs (products.images.image_variants), set on save
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ["sort_order", "id"]
@@ -65,6 +158,13 @@ class ProductImage(models.Model):
     def __str__(self):
         return f"Image for {self.product_id} ({self.sort_order})"
 
+    def save(self, *args, **kwargs):
+        self.variants = image_variants(self.url)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "url" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "variants"}
+        super().save(*args, **kwargs)
+
 class Order(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -85,18 +185,27 @@ class Order(models.Model):
     )
     delivery_address = models.CharField(max_length=255, blank=True)
     payment_proof_url = models.URLField(blank=True)
+    # Denormalized at creation from the items' unit_price snapshots
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["-created_at", "id"]
+        indexes = [
+            # Per-user order history, keyset paginated
+            models.Index(fields=["user", "-created_at", "id"], name="order_user_created_id_idx"),
+        ]
 
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Product.price at purchase time; null only on rows predating the snapshot
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.title} (Order {self.order.id})"
+        return f"{self.quantity} x {self.product.title} (Order {self.order_id})"
 
 
 class ContactMessage(models.Model):
@@ -1,6 +1,156 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 12
     page_size_query_param = "page_size"
     max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination: each page is an index range scan that
+    starts after the last (sort value, id) seen, so deep pages cost the same
+    as the first one. No COUNT(*) unless ?count=true.
+
+    Subclasses map each accepted ?ordering= value to a (field, tie-breaker)
+    pair backed by a composite index.
+    """
+    page_size = 12
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    count_query_param = "count"
+    orderings = {}
+    default_ordering = None
+    invalid_cursor_message = "Invalid cursor"
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return cls.cursor_query_param in params or params.get(cls.mode_query_param) == "cursor"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request):
+        requested = request.query_params.get("ordering", "").split(",")[0].strip()
+        key = requested if requested in self.orderings else self.default_ordering
+        return key, self.orderings[key]
+
+    def encode_cursor(self, ordering_key, value, pk):
+        payload = json.dumps({"o": ordering_key, "v": str(value), "id": pk}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, token, ordering_key, model):
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            data = json.loads(raw)
+            if data["o"] != ordering_key:
+                raise ValueError("cursor belongs to a different ordering")
+            field_name = self.orderings[ordering_key][0].lstrip("-")
+            value = model._meta.get_field(field_name).to_python(data["v"])
+            return value, int(data["id"])
+        except (ValueError, KeyError, TypeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.ordering_key, (field, tie) = self.get_ordering(request)
+        self.field_name = field.lstrip("-")
+        self.count = queryset.count() if request.query_params.get(self.count_query_param) == "true" else None
+
+        queryset = queryset.order_by(field, tie)
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            value, pk = self.decode_cursor(token, self.ordering_key, queryset.model)
+            cmp = "lt" if field.startswith("-") else "gt"
+            tie_cmp = "lt" if tie.startswith("-") else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.field_name}__{cmp}": value})
+                | Q(**{self.field_name: value, f"pk__{tie_cmp}": pk})
+            )
+
+        rows = list(queryset[: self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[: self.page_size_value]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        last = self.last
+        if isinstance(last, dict):
+            # Rows from a .values() listing
+            value, pk = last[self.field_name], last["id"]
+        else:
+            value, pk = getattr(last, self.field_name), last.pk
+        token = self.encode_cursor(self.ordering_key, value, pk)
+        url = remove_query_param(self.request.build_absolute_uri(), self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_paginated_response(self, data):
+        payload = {"next": self.get_next_link(), "results": data}
+        if self.count is not None:
+            payload = {"count": self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer", "example": 123},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class ProductKeysetPagination(KeysetPagination):
+    # Tie-breaker directions let each ordering walk (created_at DESC, id) or
+    # (price, id) forwards or backwards; see the indexes on Product.
+    orderings = {
+        "-created_at": ("-created_at", "id"),
+        "created_at": ("created_at", "-id"),
+        "price": ("price", "id"),
+        "-price": ("-price", "-id"),
+    }
+    default_ordering = "-created_at"
+
+
+class OrderKeysetPagination(KeysetPagination):
+    orderings = {
+        "-created_at": ("-created_at", "id"),
+    }
+    default_ordering = "-created_at"
+
+
+class KeysetPaginationMixin:
+    """Switch a viewset to `keyset_pagination_class` for ?pagination=cursor / ?cursor= requests."""
+    keyset_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            request = getattr(self, "request", None)
+            if self.keyset_pagination_class and request is not None and self.keyset_pagination_class.is_requested(request):
+                self._paginator = self.keyset_pagination_class()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
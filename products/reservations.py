@@ -0,0 +1,481 @@
+"""
+Short-lived stock reservations ("holds") taken at cart time.
+
+Admission control for hot products happens in a fast store instead of on the
+Product row: each product has a stock mirror (seeded from the DB, short TTL)
+and a counter of units currently held. A hold atomically checks
+`stock - held >= quantity` for every line and bumps the held counters, so
+buyers who can't get stock are turned away without touching Postgres.
+
+A hold is confirmed when the order is placed (OrderSerializer.create), which
+decrements Product.stock in the DB and then drops the held units. Holds that
+are never confirmed are swept lazily by hold() and held(), and also by the
+`release_expired_reservations` beat task where one runs. Hold payloads and
+held counters carry a TTL of the hold's lifetime plus
+RESERVATION_GRACE_SECONDS, so units lost between a claim and its settle (a
+worker dying mid-checkout) stop counting once the product goes quiet.
+
+Backends (RESERVATION_BACKEND): "redis" (Lua scripts, shared by all workers),
+"local" (a stand-in on the Django cache, only allowed while that cache is
+process-local, i.e. in development) or "off" (no holds; orders only take the
+row lock).
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+STOCK_KEY = "resv:stock:{}"
+HELD_KEY = "resv:held:{}"
+HOLD_KEY = "resv:hold:{}"
+USER_KEY = "resv:user:{}"
+EXPIRY_KEY = "resv:expiry"
+# Expired holds released inline by each hold()/held() call
+LAZY_SWEEP_LIMIT = 50
+
+
+class ReservationError(Exception):
+    pass
+
+
+class InsufficientStock(ReservationError):
+    def __init__(self, product_id):
+        super().__init__(f"Insufficient stock for product {product_id}")
+        self.product_id = product_id
+
+
+class HoldNotFound(ReservationError):
+    pass
+
+
+class ReservationsDisabled(ReservationError):
+    pass
+
+
+class HoldLimitExceeded(ReservationError):
+    pass
+
+
+def hold_ttl() -> int:
+    return getattr(settings, "RESERVATION_HOLD_SECONDS", 600)
+
+
+def mirror_ttl() -> int:
+    return getattr(settings, "RESERVATION_STOCK_MIRROR_SECONDS", 300)
+
+
+def max_holds_per_user() -> int:
+    return getattr(settings, "RESERVATION_MAX_HOLDS_PER_USER", 3)
+
+
+def max_units_per_user() -> int:
+    return getattr(settings, "RESERVATION_MAX_UNITS_PER_USER", 10)
+
+
+def keep_ttl(ttl) -> int:
+    """How long a hold's payload and the held counters it bumps are kept."""
+    return int(max(ttl, hold_ttl()) + getattr(settings, "RESERVATION_GRACE_SECONDS", 600))
+
+
+class BaseReservationStore(ABC):
+    """Backend-independent hold/claim logic; subclasses provide the atomic primitives."""
+
+    def hold(self, user_id, quantities: dict, ttl=None) -> dict:
+        quantities = {int(pid): int(qty) for pid, qty in quantities.items() if int(qty) > 0}
+        if not quantities:
+            raise ReservationError("Nothing to reserve")
+        self.release_expired(limit=LAZY_SWEEP_LIMIT)
+        self._check_user_limits(user_id, quantities)
+        ttl = ttl or hold_ttl()
+        expires_at = time.time() + ttl
+        hold = {
+            "id": uuid.uuid4().hex,
+            "user": user_id,
+            "items": {str(pid): qty for pid, qty in sorted(quantities.items())},
+            "expires_at": expires_at,
+        }
+        for _ in range(3):
+            status, detail = self._try_hold(hold, quantities, keep_ttl(ttl))
+            if status == "ok":
+                return hold
+            if status == "short":
+                raise InsufficientStock(detail)
+            self._seed_stock(detail)
+        raise ReservationError("Could not seed stock mirrors")
+
+    def get(self, hold_id):
+        raw = self._get_payload(hold_id)
+        return json.loads(raw) if raw else None
+
+    def claim(self, hold_id, user_id=None) -> dict:
+        """Remove a live hold and return its {product_id: quantity}; held units stay counted until settle()."""
+        hold = self.get(hold_id)
+        if hold is None or (user_id is not None and hold["user"] != user_id):
+            raise HoldNotFound(hold_id)
+        if hold["expires_at"] < time.time():
+            self.release(hold_id)
+            raise HoldNotFound(hold_id)
+        if not self._claim(hold_id, hold["user"]):
+            raise HoldNotFound(hold_id)
+        return {int(pid): qty for pid, qty in hold["items"].items()}
+
+    def release(self, hold_id) -> bool:
+        hold = self.get(hold_id)
+        if hold is None:
+            # Payload already gone: just drop the id from the expiry index
+            self._claim(hold_id, None)
+            return False
+        if not self._claim(hold_id, hold["user"]):
+            return False
+        self.settle({int(pid): qty for pid, qty in hold["items"].items()})
+        return True
+
+    def release_expired(self, now=None, limit=500) -> int:
+        released = 0
+        for hold_id in self._expired_ids(now or time.time(), limit):
+            if self.release(hold_id):
+                released += 1
+        return released
+
+    def held(self, product_ids, exclude_user=None) -> dict:
+        """Units held per product; `exclude_user`'s own live holds are not counted."""
+        self.release_expired(limit=LAZY_SWEEP_LIMIT)
+        held = self._held(product_ids)
+        if exclude_user is not None:
+            for hold in self.holds_for(exclude_user):
+                for pid, qty in hold["items"].items():
+                    if int(pid) in held:
+                        held[int(pid)] = max(held[int(pid)] - qty, 0)
+        return held
+
+    def _check_user_limits(self, user_id, quantities):
+        # One shopper must not be able to park a product's whole stock; checked
+        # before the atomic hold, so a burst of parallel requests can overshoot
+        # by a little (the endpoint is also throttled)
+        now = time.time()
+        live = [hold for hold in self.holds_for(user_id) if hold["expires_at"] > now]
+        if len(live) >= max_holds_per_user():
+            raise HoldLimitExceeded(f"At most {max_holds_per_user()} active reservations per user")
+        units = sum(qty for hold in live for qty in hold["items"].values()) + sum(quantities.values())
+        if units > max_units_per_user():
+            raise HoldLimitExceeded(f"At most {max_units_per_user()} reserved units per user")
+
+    def holds_for(self, user_id) -> list:
+        """Unclaimed holds of one user (these are the ones still in the held counters)."""
+        holds = [self.get(hold_id) for hold_id in self._user_hold_ids(user_id)]
+        return [hold for hold in holds if hold is not None and hold["user"] == user_id]
+
+    def _seed_stock(self, product_ids):
+        levels = dict(Product.objects.filter(id__in=product_ids).values_list("id", "stock"))
+        # Deleted products get a zero mirror so holds on them fail cleanly
+        self._set_stock_mirrors({pid: levels.get(pid, 0) for pid in product_ids}, mirror_ttl())
+
+    # Primitives -------------------------------------------------------
+
+    @abstractmethod
+    def _try_hold(self, hold, quantities, keep):
+        """
+        Return ("ok", None), ("short", product_id) or ("missing", [product_ids
+        without a mirror]). On "ok" the payload, held counters and the user's
+        hold index are kept for at least `keep` seconds.
+        """
+
+    @abstractmethod
+    def _get_payload(self, hold_id):
+        pass
+
+    @abstractmethod
+    def _claim(self, hold_id, user_id) -> bool:
+        """Delete the payload and index entries; True only for the caller that deleted the payload."""
+
+    @abstractmethod
+    def _expired_ids(self, now, limit):
+        pass
+
+    @abstractmethod
+    def _user_hold_ids(self, user_id):
+        pass
+
+    @abstractmethod
+    def _set_stock_mirrors(self, levels, ttl):
+        pass
+
+    @abstractmethod
+    def settle(self, quantities):
+        """Drop units from the held counters after a claimed hold was confirmed or abandoned."""
+
+    @abstractmethod
+    def _held(self, product_ids) -> dict:
+        pass
+
+    @abstractmethod
+    def forget_stock(self, product_ids):
+        """Drop stock mirrors after the DB stock changed; the next hold reseeds them."""
+
+
+class LocalReservationStore(BaseReservationStore):
+    """
+    Stand-in for development and tests: same semantics, state kept in the
+    Django cache and made atomic with a process-wide lock. The read-modify-
+    write steps are only atomic within one process, so get_reservation_store()
+    refuses this backend unless the cache itself is process-local.
+    """
+    _lock = threading.Lock()
+
+    def _try_hold(self, hold, quantities, keep):
+        with self._lock:
+            stock = cache.get_many([STOCK_KEY.format(pid) for pid in quantities])
+            missing = [pid for pid in quantities if STOCK_KEY.format(pid) not in stock]
+            if missing:
+                return "missing", missing
+            held = cache.get_many([HELD_KEY.format(pid) for pid in quantities])
+            for pid, qty in quantities.items():
+                if stock[STOCK_KEY.format(pid)] - held.get(HELD_KEY.format(pid), 0) < qty:
+                    return "short", pid
+            cache.set_many(
+                {HELD_KEY.format(pid): held.get(HELD_KEY.format(pid), 0) + qty for pid, qty in quantities.items()},
+                keep,
+            )
+            cache.set(HOLD_KEY.format(hold["id"]), json.dumps(hold), keep)
+            user_key = USER_KEY.format(hold["user"])
+            cache.set(user_key, cache.get(user_key, set()) | {hold["id"]}, keep)
+            expiry = cache.get(EXPIRY_KEY, {})
+            expiry[hold["id"]] = hold["expires_at"]
+            cache.set(EXPIRY_KEY, expiry, None)
+            return "ok", None
+
+    def _get_payload(self, hold_id):
+        return cache.get(HOLD_KEY.format(hold_id))
+
+    def _claim(self, hold_id, user_id):
+        with self._lock:
+            expiry = cache.get(EXPIRY_KEY, {})
+            if expiry.pop(hold_id, None) is not None:
+                cache.set(EXPIRY_KEY, expiry, None)
+            if user_id is not None:
+                user_key = USER_KEY.format(user_id)
+                hold_ids = cache.get(user_key, set())
+                if hold_id in hold_ids:
+                    cache.set(user_key, hold_ids - {hold_id}, keep_ttl(0))
+            return cache.delete(HOLD_KEY.format(hold_id))
+
+    def _expired_ids(self, now, limit):
+        expiry = cache.get(EXPIRY_KEY, {})
+        return sorted((hid for hid, exp in expiry.items() if exp <= now), key=expiry.get)[:limit]
+
+    def _user_hold_ids(self, user_id):
+        return cache.get(USER_KEY.format(user_id), set())
+
+    def _set_stock_mirrors(self, levels, ttl):
+        with self._lock:
+            for pid, stock in levels.items():
+                cache.add(STOCK_KEY.format(pid), stock, ttl)
+
+    def settle(self, quantities):
+        with self._lock:
+            for pid, qty in quantities.items():
+                key = HELD_KEY.format(pid)
+                try:
+                    # decr() keeps the counter's TTL
+                    if cache.decr(key, qty) <= 0:
+                        cache.delete(key)
+                except ValueError:
+                    pass  # counter already expired
+
+    def _held(self, product_ids):
+        found = cache.get_many([HELD_KEY.format(pid) for pid in product_ids])
+        return {pid: found.get(HELD_KEY.format(pid), 0) for pid in product_ids}
+
+    def forget_stock(self, product_ids):
+        cache.delete_many([STOCK_KEY.format(pid) for pid in product_ids])
+
+
+# KEYS: stock1, held1, ..., stockN, heldN, hold key, expiry zset, user's hold set
+# ARGV: qty1..qtyN, hold payload, expires_at, hold id, seconds to keep counters and payload
+HOLD_SCRIPT = """
+local n = #ARGV - 4
+local keep = tonumber(ARGV[n + 4])
+local missing = {}
+for i = 1, n do
+    if redis.call('EXISTS', KEYS[2 * i - 1]) == 0 then
+        table.insert(missing, i)
+    end
+end
+if #missing > 0 then
+    table.insert(missing, 1, -1)
+    return missing
+end
+for i = 1, n do
+    local stock = tonumber(redis.call('GET', KEYS[2 * i - 1]))
+    local held = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+    if stock - held < tonumber(ARGV[i]) then
+        return {0, i}
+    end
+end
+-- Counters outlive every hold counted in them (TTL only ever grows)
+local function keep_for(key)
+    if redis.call('TTL', key) < keep then
+        redis.call('EXPIRE', key, keep)
+    end
+end
+for i = 1, n do
+    redis.call('INCRBY', KEYS[2 * i], ARGV[i])
+    keep_for(KEYS[2 * i])
+end
+redis.call('SET', KEYS[2 * n + 1], ARGV[n + 1], 'EX', keep)
+redis.call('ZADD', KEYS[2 * n + 2], ARGV[n + 2], ARGV[n + 3])
+redis.call('SADD', KEYS[2 * n + 3], ARGV[n + 3])
+keep_for(KEYS[2 * n + 3])
+return {1}
+"""
+
+# KEYS: hold key, expiry zset[, user's hold set]; ARGV: hold id
+CLAIM_SCRIPT = """
+redis.call('ZREM', KEYS[2], ARGV[1])
+if KEYS[3] then
+    redis.call('SREM', KEYS[3], ARGV[1])
+end
+return redis.call('DEL', KEYS[1])
+"""
+
+# KEYS: held counters; ARGV: quantities. Counters that reach zero are dropped.
+SETTLE_SCRIPT = """
+for i = 1, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 and redis.call('DECRBY', KEYS[i], ARGV[i]) <= 0 then
+        redis.call('DEL', KEYS[i])
+    end
+end
+return 1
+"""
+
+
+class RedisReservationStore(BaseReservationStore):
+    """Shared store: every multi-key step runs as a single Lua script."""
+
+    def __init__(self, client=None):
+        if client is None:
+            from django_redis import get_redis_connection
+
+            client = get_redis_connection(getattr(settings, "SHARED_CACHE_ALIAS", "default"))
+        self.client = client
+        self._hold = client.register_script(HOLD_SCRIPT)
+        self._claim_script = client.register_script(CLAIM_SCRIPT)
+        self._settle = client.register_script(SETTLE_SCRIPT)
+
+    def _try_hold(self, hold, quantities, keep):
+        pids = list(quantities)
+        keys = []
+        for pid in pids:
+            keys += [STOCK_KEY.format(pid), HELD_KEY.format(pid)]
+        keys += [HOLD_KEY.format(hold["id"]), EXPIRY_KEY, USER_KEY.format(hold["user"])]
+        args = [quantities[pid] for pid in pids] + [json.dumps(hold), hold["expires_at"], hold["id"], keep]
+        result = [int(x) for x in self._hold(keys=keys, args=args)]
+        if result[0] == 1:
+            return "ok", None
+        if result[0] == 0:
+            return "short", pids[result[1] - 1]
+        return "missing", [pids[i - 1] for i in result[1:]]
+
+    def _get_payload(self, hold_id):
+        return self.client.get(HOLD_KEY.format(hold_id))
+
+    def _claim(self, hold_id, user_id):
+        keys = [HOLD_KEY.format(hold_id), EXPIRY_KEY]
+        if user_id is not None:
+            keys.append(USER_KEY.format(user_id))
+        return bool(self._claim_script(keys=keys, args=[hold_id]))
+
+    def _expired_ids(self, now, limit):
+        return [hid.decode() if isinstance(hid, bytes) else hid
+                for hid in self.client.zrangebyscore(EXPIRY_KEY, "-inf", now, start=0, num=limit)]
+
+    def _user_hold_ids(self, user_id):
+        return [hid.decode() if isinstance(hid, bytes) else hid
+                for hid in self.client.smembers(USER_KEY.format(user_id))]
+
+    def _set_stock_mirrors(self, levels, ttl):
+        pipe = self.client.pipeline()
+        for pid, stock in levels.items():
+            pipe.set(STOCK_KEY.format(pid), stock, ex=ttl, nx=True)
+        pipe.execute()
+
+    def settle(self, quantities):
+        pids = list(quantities)
+        if pids:
+            self._settle(keys=[HELD_KEY.format(pid) for pid in pids], args=[quantities[pid] for pid in pids])
+
+    def _held(self, product_ids):
+        pids = list(product_ids)
+        values = self.client.mget([HELD_KEY.format(pid) for pid in pids]) if pids else []
+        return {pid: int(v or 0) for pid, v in zip(pids, values)}
+
+    def forget_stock(self, product_ids):
+        keys = [STOCK_KEY.format(pid) for pid in product_ids]
+        if keys:
+            self.client.delete(*keys)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def reservations_enabled() -> bool:
+    return getattr(settings, "RESERVATION_BACKEND", "local") != "off"
+
+
+def build_reservation_store() -> BaseReservationStore:
+    backend = getattr(settings, "RESERVATION_BACKEND", "local")
+    if backend == "redis":
+        return RedisReservationStore()
+    if backend == "local":
+        from ecommerce_backend.checks import PROCESS_LOCAL_BACKENDS, shared_cache_backend
+
+        if shared_cache_backend() not in PROCESS_LOCAL_BACKENDS:
+            raise ImproperlyConfigured(
+                "RESERVATION_BACKEND=local is only atomic within one process but the cache is shared "
+                "between processes; use RESERVATION_BACKEND=redis or off."
+            )
+        return LocalReservationStore()
+    if backend == "off":
+        raise ReservationsDisabled("Stock reservations are turned off")
+    raise ImproperlyConfigured(f"Unknown RESERVATION_BACKEND {backend!r}")
+
+
+def get_reservation_store() -> BaseReservationStore:
+    """The configured store; raises ReservationsDisabled when RESERVATION_BACKEND=off."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = build_reservation_store()
+    return _store
+
+
+def forget_reserved_stock(product_ids) -> None:
+    if not reservations_enabled():
+        return
+    try:
+        get_reservation_store().forget_stock(product_ids)
+    except Exception:
+        logger.warning("Could not drop reservation stock mirrors", exc_info=True)
+
+
+def held_quantities(product_ids, exclude_user=None) -> dict:
+    """Units currently held per product (minus exclude_user's own holds); 0s when the store is unreachable."""
+    if not reservations_enabled():
+        return {pid: 0 for pid in product_ids}
+    try:
+        return get_reservation_store().held(product_ids, exclude_user=exclude_user)
+    except Exception:
+        logger.warning("Reservation store unavailable; ignoring holds", exc_info=True)
+        return {pid: 0 for pid in product_ids}
@@ -0,0 +1,104 @@
+"""
+Typo-tolerant title suggestions for the search box.
+
+PostgreSQL answers from the pg_trgm GIN index on Product.title (migration
+0015) using word similarity, so partial words ("ray ba") and misspellings
+("aviater") both match. Other databases use a small in-process trigram index
+rebuilt whenever the products generation changes.
+"""
+import re
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import connections
+
+from .cache import PRODUCTS, get_generations, versioned_prefix
+from .models import Product
+
+MIN_QUERY_LENGTH = 2
+MAX_LIMIT = 20
+# pg_trgm's default word_similarity_threshold
+SIMILARITY_THRESHOLD = 0.6
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize_query(q: str) -> str:
+    return " ".join(_WORD_RE.findall((q or "").lower()))
+
+
+def trigrams(text: str) -> set:
+    """pg_trgm-style trigrams: lowercase words padded with two leading and one trailing space."""
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """In-memory fallback: inverted trigram index over (id, title) pairs."""
+
+    def __init__(self, rows):
+        self.titles = {}
+        self.postings = {}
+        for pid, title in rows:
+            self.titles[pid] = title
+            for gram in trigrams(title):
+                self.postings.setdefault(gram, set()).add(pid)
+
+    def search(self, q: str, limit: int):
+        grams = trigrams(q)
+        if not grams:
+            return []
+        hits = {}
+        for gram in grams:
+            for pid in self.postings.get(gram, ()):
+                hits[pid] = hits.get(pid, 0) + 1
+        # Share of the query's trigrams found in the title (~ word_similarity)
+        scored = [(count / len(grams), pid) for pid, count in hits.items()]
+        scored = [(score, pid) for score, pid in scored if score >= SIMILARITY_THRESHOLD]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [{"id": pid, "title": self.titles[pid], "score": round(score, 3)} for score, pid in scored[:limit]]
+
+
+_fallback_lock = threading.Lock()
+_fallback_index = {"generation": None, "index": None}
+
+
+def _fallback_search(q: str, limit: int):
+    generation = get_generations([PRODUCTS])[PRODUCTS]
+    with _fallback_lock:
+        if _fallback_index["generation"] != generation:
+            _fallback_index["index"] = TrigramIndex(Product.objects.values_list("id", "title"))
+            _fallback_index["generation"] = generation
+        index = _fallback_index["index"]
+    return index.search(q, limit)
+
+
+def _postgres_search(q: str, limit: int):
+    rows = (
+        Product.objects.filter(title__trigram_word_similar=q)
+        .annotate(score=TrigramWordSimilarity(q, "title"))
+        .order_by("-score", "id")
+        .values_list("id", "title", "score")[:limit]
+    )
+    return [{"id": pid, "title": title, "score": round(score, 3)} for pid, title, score in rows]
+
+
+def suggest_products(q: str, limit: int = 8):
+    q = normalize_query(q)
+    if len(q) < MIN_QUERY_LENGTH:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    key = f"{versioned_prefix((PRODUCTS,))}:suggest:{limit}:{q}"
+    results = cache.get(key)
+    if results is None:
+        if connections[Product.objects.db].vendor == "postgresql":
+            results = _postgres_search(q, limit)
+        else:
+            results = _fallback_search(q, limit)
+        cache.set(key, results, getattr(settings, "SUGGEST_CACHE_SECONDS", 60))
+    return results
@@ -1,9 +1,13 @@
 from rest_framework import serializers
 from .models import Product, Category, Order, OrderItem, ContactMessage
 from django.db import transaction
-from django.db.models import F
+from django.db.models import F, Case, When, PositiveIntegerField
+from django.db.models.functions import Now
 from django.conf import settings
 from .tasks import send_order_telegram
+from .availability import forget_stock
+from .images import image_variants
+from .reservations import HoldNotFound, ReservationsDisabled, forget_reserved_stock, get_reservation_store, held_quantities
 
 class CategorySerializer(serializers.ModelSerializer):
     children_count = serializers.IntegerField(read_only=True)
@@ -12,6 +16,14 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ["id", "name", "parent", "children_count", "has_children", "created_at"]
 
+    def validate_parent(self, parent):
+        # Category.save() guards this too, but a model ValidationError would be a 500 here
+        category = self.instance
+        if category is not None and parent is not None:
+            if parent.pk == category.pk or (category.path and parent.path.startswith(category.path)):
+                raise serializers.ValidationError("A category cannot be moved under itself or its descendants.")
+        return parent
+
 class ProductSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(write_only=True, queryset=Category.objects.all(), source="category")
@@ -34,53 +46,72 @@ class ProductSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
-    def _cld_variant(self, url: str, transform: str) -> str:
-        # Insert Cloudinary transform after '/upload/' if present; otherwise return original URL
-        try:
-            marker = '/upload/'
-            idx = url.find(marker)
-            if idx == -1:
-                return url
-            return url[: idx + len(marker)] + f"{transform}/" + url[idx + len(marker):]
-        except Exception:
-            return url
+    # Relations rendered nested by default; under ?fields= they collapse to
+    # their pk unless named in ?expand=
+    expandable_fields = ("category",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Sparse fieldsets: the view passes "fields" (None = everything) and
+        # "expand" in the context. "images.thumb" keeps only that variant.
+        requested = self.context.get("fields")
+        self.image_variant_names = None
+        if requested is None:
+            return
+        top_level = {name.split(".", 1)[0] for name in requested}
+        variants = {name.split(".", 1)[1] for name in requested if name.startswith("images.")}
+        if variants and "images" not in requested:
+            self.image_variant_names = variants
+        for name in list(self.fields):
+            if name not in top_level and not self.fields[name].write_only:
+                self.fields.pop(name)
+        expand = self.context.get("expand") or set()
+        for name in self.expandable_fields:
+            if name in self.fields and name not in expand:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
 
     def get_images(self, obj):
-        # Build list of dicts with tiny/thumb/medium/full variants; fall back to original for non-Cloudinary URLs
-        raw_urls = [img.url for img in getattr(obj, 'images').all()] if hasattr(obj, 'images') else []
-        if not raw_urls and getattr(obj, 'image_url', ''):
-            raw_urls = [obj.image_url]
-
-        results = []
-        for u in raw_urls:
-            tiny = self._cld_variant(u, 'f_auto,q_auto:low,c_limit,dpr_auto,w_120')
-            thumb = self._cld_variant(u, 'f_auto,q_auto:eco,c_limit,dpr_auto,w_240')
-            medium = self._cld_variant(u, 'f_auto,q_auto,c_limit,dpr_auto,w_800')
-            full = self._cld_variant(u, 'f_auto,q_auto,c_limit,dpr_auto,w_1600')
-            hero = self._cld_variant(u, 'f_auto,q_auto:best,c_limit,dpr_auto,w_3000')
-            results.append({
-                "orig": u,
-                "tiny": tiny,
-                "thumb": thumb,
-                "medium": medium,
-                "full": full,
-                "hero": hero,
-            })
-        return results
+        # Variant maps are stored on ProductImage; legacy rows and the
+        # image_url fallback go through the memoized builder
+        images = [img.variants or image_variants(img.url) for img in obj.images.all()] if hasattr(obj, 'images') else []
+        if not images and getattr(obj, 'image_url', ''):
+            images = [image_variants(obj.image_url)]
+        if self.image_variant_names:
+            images = [{k: v for k, v in img.items() if k in self.image_variant_names} for img in images]
+        return images
+
+class CategorySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ["id", "name"]
+
+
+class OrderItemProductSerializer(ProductSerializer):
+    # Trimmed product card for order history: no description/stock/timestamps
+    category = CategorySummarySerializer(read_only=True)
+    category_id = None
+
+    class Meta:
+        model = Product
+        fields = ["id", "title", "price", "image_url", "category", "images"]
+
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = OrderItemProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(), source="product", write_only=True
     )
 
     class Meta:
         model = OrderItem
-        fields = ["id", "product", "product_id", "quantity"]
+        fields = ["id", "product", "product_id", "quantity", "unit_price"]
+        read_only_fields = ["unit_price"]
 
 
 class OrderSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True)
+    items = OrderItemSerializer(many=True, required=False)
+    # Hold id from /api/reservations/; the order is placed from the held items
+    reservation = serializers.CharField(write_only=True, required=False)
 
     class Meta:
         model = Order
@@ -91,40 +122,116 @@ class OrderSerializer(serializers.ModelSerializer):
             "status",
             "delivery_address",
             "payment_proof_url",
+            "total_amount",
+            "item_count",
             "items",
+            "reservation",
         ]
-        read_only_fields = ["user", "created_at"]
+        read_only_fields = ["user", "created_at", "total_amount", "item_count"]
+
+    def validate(self, attrs):
+        if self.instance is None and not attrs.get("items") and not attrs.get("reservation"):
+            raise serializers.ValidationError({"items": "This field is required."})
+        return attrs
+
+    @staticmethod
+    def merge_items(items_data):
+        # Merge duplicate lines so each product is locked and decremented once
+        quantities = {}
+        for item_data in items_data:
+            product_id = item_data["product"].id
+            quantities[product_id] = quantities.get(product_id, 0) + item_data.get("quantity", 1)
+        return quantities
 
     def create(self, validated_data):
-        items_data = validated_data.pop("items")
+        items_data = validated_data.pop("items", None) or []
+        reservation = validated_data.pop("reservation", None)
         user = self.context["request"].user
+        quantities = self.merge_items(items_data)
+
+        if reservation:
+            try:
+                store = get_reservation_store()
+            except ReservationsDisabled:
+                raise serializers.ValidationError({"reservation": "Reservation not found or expired."})
+            hold = store.get(reservation)
+            if hold and quantities and {int(pid): qty for pid, qty in hold["items"].items()} != quantities:
+                raise serializers.ValidationError({"reservation": "Items do not match the reservation."})
+            try:
+                # Claimed units stay counted as held until settled below
+                quantities = store.claim(reservation, user.id)
+            except HoldNotFound:
+                raise serializers.ValidationError({"reservation": "Reservation not found or expired."})
+            held = {}
+        else:
+            # Units other shoppers are holding are not available to this order;
+            # the buyer's own holds are
+            held = held_quantities(list(quantities), exclude_user=user.id)
 
-        with transaction.atomic():
-            order = Order.objects.create(user=user, **validated_data)
-
-            for item_data in items_data:
-                product = item_data.get("product") or Product.objects.get(id=item_data["product_id"])  # ensure product exists
-                quantity = item_data.get("quantity", 1)
-
-                # Update stock with safety check
-                updated = Product.objects.filter(id=product.id, stock__gte=quantity).update(stock=F("stock") - quantity)
-                if not updated:
-                    raise serializers.ValidationError(
-                        {"stock": f"Insufficient stock for product '{product.title}'."}
-                    )
-
-                OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    quantity=quantity,
+        try:
+            with transaction.atomic():
+                # Lock every affected row in one statement, in id order, so two
+                # checkouts sharing products always queue instead of deadlocking.
+                # Claimed holds take the lock too: on purpose, the row is the
+                # source of truth, and the hold's stock mirror can lag an admin
+                # stock edit or a direct order by up to its TTL.
+                locked = {
+                    p.id: p
+                    for p in Product.objects.select_for_update().filter(id__in=quantities).order_by("id").only("id", "title", "stock", "price")
+                }
+                for product_id, quantity in quantities.items():
+                    product = locked.get(product_id)
+                    if product is None or product.stock - held.get(product_id, 0) < quantity:
+                        title = product.title if product else product_id
+                        raise serializers.ValidationError(
+                            {"stock": f"Insufficient stock for product '{title}'."}
+                        )
+
+                Product.objects.filter(id__in=quantities).update(
+                    stock=Case(
+                        *[When(id=product_id, then=F("stock") - quantity) for product_id, quantity in quantities.items()],
+                        default=F("stock"),
+                        output_field=PositiveIntegerField(),
+                    ),
+                    # Keeps Last-Modified on product detail honest for stock changes
+                    updated_at=Now(),
                 )
 
+                # Snapshot prices from the locked rows; totals are stored on the order
+                total = sum(locked[product_id].price * quantity for product_id, quantity in quantities.items())
+                order = Order.objects.create(
+                    user=user, total_amount=total, item_count=len(quantities), **validated_data
+                )
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, product=locked[product_id], quantity=quantity, unit_price=locked[product_id].price)
+                    for product_id, quantity in quantities.items()
+                ])
+        except Exception:
+            if reservation:
+                store.settle(quantities)
+            raise
+
+        # Stock moved via update(), which sends no signals: drop the live stock keys
+        product_ids = list(quantities)
+        transaction.on_commit(lambda: forget_stock(product_ids))
+        transaction.on_commit(lambda: forget_reserved_stock(product_ids))
+        if reservation:
+            transaction.on_commit(lambda: store.settle(quantities))
         # Enqueue Telegram notification after commit
         transaction.on_commit(lambda: send_order_telegram.delay(order.id))
 
         return order
 
 
+class ReservationItemSerializer(serializers.Serializer):
+    product_id = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), source="product")
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class ReservationSerializer(serializers.Serializer):
+    items = ReservationItemSerializer(many=True, allow_empty=False)
+
+
 class ContactMessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ContactMessage
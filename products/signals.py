@@ -1,33 +1,74 @@
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
-from .models import Product, Category
+from django.utils import timezone
+from .availability import forget_stock
+from .reservations import forget_reserved_stock
+from .cache import PRODUCTS, CATEGORIES, bump_generation
+from .warmup import schedule_catalog_warmup
+from .models import Product, ProductImage, Category
 
+# Saves touching only these fields leave cached listings valid; stock is
+# merged into listings from the short-lived availability keys instead.
+STOCK_ONLY_FIELDS = {"stock", "updated_at"}
 
-def _clear_cache(reason: str):
-    # Pragmatic approach: clear all API caches to avoid stale lists quickly.
-    # Can be refined to targeted keys later.
-    try:
-        cache.clear()
-    except Exception:
-        pass
+
+def _invalidate(*namespaces):
+    # Bump after commit so concurrent readers can't re-cache pre-commit rows
+    # under the new generation; bumping is O(1) and leaves other keys alone.
+    def bump():
+        for ns in namespaces:
+            try:
+                bump_generation(ns)
+            except Exception:
+                pass
+
+    transaction.on_commit(bump)
+    # Re-fill hot pages under the new generation (debounced, off-request)
+    schedule_catalog_warmup()
+
+
+def _forget_stock(product_id):
+    forget_stock([product_id])
+    forget_reserved_stock([product_id])
+
+
+def _is_stock_only(instance: Product, update_fields) -> bool:
+    if update_fields:
+        return set(update_fields) <= STOCK_ONLY_FIELDS
+    changed = instance.changed_fields()
+    return changed is not None and changed <= STOCK_ONLY_FIELDS
 
 
 @receiver(post_save, sender=Product)
-def product_saved(sender, instance: Product, created, **kwargs):
-    _clear_cache("product_saved")
+def product_saved(sender, instance: Product, created, update_fields=None, **kwargs):
+    if not created:
+        # Stock may have changed either way: drop live stock and reservation mirrors
+        transaction.on_commit(lambda: _forget_stock(instance.pk))
+        if _is_stock_only(instance, update_fields):
+            return
+    _invalidate(PRODUCTS)
 
 
 @receiver(post_delete, sender=Product)
 def product_deleted(sender, instance: Product, **kwargs):
-    _clear_cache("product_deleted")
+    _invalidate(PRODUCTS)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def product_image_changed(sender, instance: ProductImage, **kwargs):
+    # Images are part of the product payload: move its Last-Modified/ETag too
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+    _invalidate(PRODUCTS)
 
 
 @receiver(post_save, sender=Category)
 def category_saved(sender, instance: Category, created, **kwargs):
-    _clear_cache("category_saved")
+    # Product payloads embed their category, so both namespaces go stale
+    _invalidate(CATEGORIES, PRODUCTS)
 
 
 @receiver(post_delete, sender=Category)
 def category_deleted(sender, instance: Category, **kwargs):
-    _clear_cache("category_deleted")
+    _invalidate(CATEGORIES, PRODUCTS)
@@ -3,7 +3,9 @@ import requests
 import logging
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from .models import Order, ContactMessage
+from .warmup import WARM_PENDING_KEY, warm_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -15,16 +17,16 @@ def send_order_telegram(self, order_id: int):
     if not (bot_token and chat_id):
         logger.info("Telegram credentials not configured; skipping notification for order %s", order_id)
         return
-    order = Order.objects.filter(id=order_id).first()
+    order = Order.objects.select_related("user").filter(id=order_id).first()
     if not order:
         logger.warning("Order %s not found for telegram notification", order_id)
         return
     user = order.user
-    item_count = order.items.count()
     text = (
         f"New Order #{order.id}\n"
         f"User: {getattr(user, 'username', str(user))}\n"
-        f"Items: {item_count}\n"
+        f"Items: {order.item_count}\n"
+        f"Total: {order.total_amount}\n"
         f"Status: {order.status}\n"
         f"Created: {order.created_at:%Y-%m-%d %H:%M:%S}\n"
         f"Address: {order.delivery_address or '-'}\n"
@@ -74,3 +76,26 @@ def process_payment_proof(self, order_id: int, proof_url: str):
     # Placeholder for image processing (e.g., compress/scan/thumbnail). Currently no-op.
     logger.info("Processing payment proof for order %s at %s", order_id, proof_url)
     return True
+
+
+@shared_task
+def release_expired_reservations():
+    # Beat-scheduled: return units from holds that were never turned into orders.
+    # hold()/held() also sweep lazily, so this only keeps quiet products tidy.
+    from .reservations import get_reservation_store, reservations_enabled
+
+    if not reservations_enabled():
+        return 0
+    released = get_reservation_store().release_expired()
+    if released:
+        logger.info("Released %s expired stock reservations", released)
+    return released
+
+
+@shared_task
+def warm_catalog_cache():
+    # Drop the debounce marker first so edits made while warming queue another run
+    cache.delete(WARM_PENDING_KEY)
+    warmed = warm_catalog()
+    logger.info("Warmed %s catalog pages", warmed)
+    return warmed
@@ -4,28 +4,113 @@ from rest_framework.permissions import IsAdminUser
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.throttling import ScopedRateThrottle, UserRateThrottle
 from django.core.files.storage import default_storage
 from django.conf import settings
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 import requests
 import logging
-from django.db.models import Count, Case, When, BooleanField
-from .models import Product, Category, Order, ContactMessage
-from .serializers import ProductSerializer, CategorySerializer,  OrderSerializer, ContactMessageSerializer
+from django.db.models import Count, Case, When, BooleanField, Prefetch
+from .models import Product, ProductImage, Category, Order, OrderItem, ContactMessage
+from .serializers import ProductSerializer, CategorySerializer,  OrderSerializer, ContactMessageSerializer, ReservationSerializer
+from .reservations import HoldLimitExceeded, InsufficientStock, ReservationsDisabled, get_reservation_store
+from datetime import datetime, timezone
 from .tasks import send_contact_telegram, process_payment_proof
 from django.db import transaction
-from .filters import ProductFilter
+from .filters import ProductFilter, ProductSearchFilter
+from .pagination import KeysetPaginationMixin, ProductKeysetPagination, OrderKeysetPagination
+from .cache import PRODUCTS, CATEGORIES, catalog_cache_page, cached_bytes
+from .category_tree import build_category_tree
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import condition
+from .conditional import category_etag, product_etag, product_last_modified
+from ecommerce_backend.renderers import FastJSONRenderer
+from .availability import get_stock_levels, overlay_stock
+from .search import suggest_products
+from .cards import build_cards, card_rows
 from django_filters.rest_framework import DjangoFilterBackend
 
+class QueryPlanMixin:
+    """
+    Apply a per-action query plan on top of get_queryset().
+
+    `query_plans` maps an action name (or "default") to a dict with optional
+    "select_related" and "prefetch_related" entries. Prefetch entries may be
+    callables so each request gets a fresh Prefetch queryset.
+    """
+    query_plans = {}
+
+    def get_query_plan(self):
+        plans = self.query_plans
+        return plans.get(getattr(self, "action", None), plans.get("default", {}))
+
+    def apply_query_plan(self, queryset):
+        plan = self.get_query_plan()
+        select = plan.get("select_related")
+        if select:
+            queryset = queryset.select_related(*select)
+        prefetch = plan.get("prefetch_related")
+        if prefetch:
+            queryset = queryset.prefetch_related(*[p() if callable(p) else p for p in prefetch])
+        return queryset
+
+    def get_queryset(self):
+        return self.apply_query_plan(super().get_queryset())
+
+
+def product_images_prefetch():
+    # One query for all images on the page, already in display order
+    return Prefetch("images", queryset=ProductImage.objects.order_by("sort_order", "id"))
+
+
+PRODUCT_READ_PLAN = {
+    "select_related": ("category",),
+    "prefetch_related": (product_images_prefetch,),
+}
+
+
+# Columns OrderItemSerializer / OrderItemProductSerializer render; keeps the
+# product's description, stock and search_vector out of order history
+ORDER_ITEM_COLUMNS = (
+    "id", "order_id", "product_id", "quantity", "unit_price",
+    "product__id", "product__title", "product__price", "product__image_url", "product__category_id",
+    "product__category__id", "product__category__name",
+)
+ORDER_ITEM_IMAGE_COLUMNS = ("id", "product_id", "url", "variants", "sort_order")
+
+
+def order_items_prefetch():
+    return Prefetch(
+        "items",
+        queryset=OrderItem.objects.select_related("product__category").only(*ORDER_ITEM_COLUMNS).order_by("id"),
+    )
+
+
+def order_item_images_prefetch():
+    return Prefetch(
+        "items__product__images",
+        queryset=ProductImage.objects.only(*ORDER_ITEM_IMAGE_COLUMNS).order_by("sort_order", "id"),
+    )
+
+
+# items -> product -> category in one query (trimmed columns), all item images in a second one
+ORDER_READ_PLAN = {
+    "prefetch_related": (order_items_prefetch, order_item_images_prefetch),
+}
+
+
 class IsAdminOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return True
         return bool(request.user and request.user.is_authenticated and request.user.is_admin)
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TTL', 300)), name="list")
-@method_decorator(cache_page(getattr(settings, 'CACHE_TTL', 300)), name="retrieve")
+# condition() sits outermost so a matching If-None-Match is a 304 before the page cache or DB is touched
+@method_decorator(condition(etag_func=category_etag), name="list")
+@method_decorator(condition(etag_func=category_etag), name="retrieve")
+@method_decorator(catalog_cache_page(getattr(settings, 'CACHE_TTL', 300), namespaces=(CATEGORIES,)), name="list")
+@method_decorator(catalog_cache_page(getattr(settings, 'CACHE_TTL', 300), namespaces=(CATEGORIES,)), name="retrieve")
 class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -50,22 +135,149 @@ class CategoryViewSet(viewsets.ModelViewSet):
                 qs = qs.filter(parent_id=parent)
         return qs.order_by("name")
 
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def tree(self, request):
+        # Whole navigation tree in one response, built from a single query
+        def build():
+            rows = Category.objects.order_by("name").values("id", "name", "parent_id", "created_at")
+            return FastJSONRenderer().render(build_category_tree(rows))
+
+        etag, body = cached_bytes((CATEGORIES,), "tree", build)
+        response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        # 304 (with the ETag copied over) when If-None-Match matches
+        return get_conditional_response(request, etag=etag, response=response)
+
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TTL', 120)), name="list")
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.select_related("category").all()
+@method_decorator(catalog_cache_page(getattr(settings, 'CACHE_TTL', 120), namespaces=(PRODUCTS, CATEGORIES), on_hit=overlay_stock), name="list")
+@method_decorator(catalog_cache_page(getattr(settings, 'CACHE_TTL', 120), namespaces=(PRODUCTS, CATEGORIES), on_hit=overlay_stock), name="featured")
+@method_decorator(catalog_cache_page(getattr(settings, 'CACHE_TTL', 120), namespaces=(PRODUCTS, CATEGORIES), on_hit=overlay_stock), name="cards")
+@method_decorator(condition(etag_func=product_etag, last_modified_func=product_last_modified), name="retrieve")
+class ProductViewSet(KeysetPaginationMixin, QueryPlanMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.defer("search_vector")
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrReadOnly]
     filterset_class = ProductFilter
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
     ordering_fields = ["price", "created_at"]
     ordering = ["-created_at"]
     search_fields = ["title", "description"]
+    keyset_pagination_class = ProductKeysetPagination
+    query_plans = {
+        "list": PRODUCT_READ_PLAN,
+        "retrieve": PRODUCT_READ_PLAN,
+        "featured": PRODUCT_READ_PLAN,
+        "cards": {},
+        "default": PRODUCT_READ_PLAN,
+    }
+    # ?fields= / ?expand= apply to these actions; writes always get the full shape
+    sparse_actions = ("list", "retrieve", "featured")
+    # Columns always loaded: pk plus the keyset/ordering fields
+    sparse_base_columns = ("id", "created_at", "price")
+    # Output field -> model columns it reads
+    sparse_columns = {
+        "title": ("title",),
+        "description": ("description",),
+        "stock": ("stock",),
+        "image_url": ("image_url",),
+        "images": ("image_url",),
+        "is_featured": ("is_featured",),
+        "category": ("category",),
+        "updated_at": ("updated_at",),
+    }
 
+    def _param_set(self, name):
+        raw = self.request.query_params.get(name)
+        if raw is None:
+            return None
+        return {part.strip() for part in raw.split(",") if part.strip()}
 
-class OrderViewSet(viewsets.ModelViewSet):
+    def get_sparse_fields(self):
+        """(fields, expand) from the query string; fields is None when not restricted."""
+        if getattr(self, "action", None) not in self.sparse_actions or getattr(self, "request", None) is None:
+            return None, set()
+        return self._param_set("fields"), self._param_set("expand") or set()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"], context["expand"] = self.get_sparse_fields()
+        return context
+
+    def get_query_plan(self):
+        plan = super().get_query_plan()
+        fields, expand = self.get_sparse_fields()
+        if fields is None:
+            return plan
+        top_level = {name.split(".", 1)[0] for name in fields}
+        plan = dict(plan)
+        if "images" not in top_level:
+            plan["prefetch_related"] = ()
+        if "category" not in top_level or "category" not in expand:
+            plan["select_related"] = ()
+        return plan
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields, _ = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        columns = set(self.sparse_base_columns)
+        for name in fields:
+            columns.update(self.sparse_columns.get(name.split(".", 1)[0], ()))
+        return queryset.only(*columns)
+
+    @action(detail=False, methods=["get"])
+    def featured(self, request):
+        qs = self.filter_queryset(self.get_queryset()).filter(is_featured=True)
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(qs, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def cards(self, request):
+        # Read-only listing with the same filters, ordering, pagination and
+        # JSON shape as list, built from .values() rows instead of serializers
+        rows = card_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(build_cards(page))
+        return Response(build_cards(rows))
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def suggest(self, request):
+        # Autocomplete: top titles by trigram word similarity for ?q= (limit <= 20)
+        try:
+            limit = int(request.query_params.get("limit", 8))
+        except ValueError:
+            limit = 8
+        return Response({"results": suggest_products(request.query_params.get("q", ""), limit)})
+
+    @action(detail=False, methods=["get"])
+    def availability(self, request):
+        # Live stock for ?ids=1,2,3 (max 100); cheap enough to poll from product pages
+        raw = request.query_params.get("ids", "")
+        try:
+            ids = [int(x) for x in raw.split(",") if x.strip()][:100]
+        except ValueError:
+            return Response({"detail": "ids must be a comma-separated list of integers."}, status=400)
+        levels = get_stock_levels(ids)
+        results = [{"id": pid, "stock": levels[pid], "in_stock": levels[pid] > 0} for pid in ids if pid in levels]
+        response = Response({"results": results})
+        response["Cache-Control"] = f"max-age={getattr(settings, 'STOCK_CACHE_SECONDS', 15)}"
+        return response
+
+
+class OrderViewSet(KeysetPaginationMixin, QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_pagination_class = OrderKeysetPagination
+    query_plans = {
+        "list": ORDER_READ_PLAN,
+        "retrieve": ORDER_READ_PLAN,
+    }
 
     def get_queryset(self):
       
@@ -73,7 +285,7 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Order.objects.none()
  
         if self.request.user.is_authenticated:
-            return Order.objects.filter(user=self.request.user)
+            return self.apply_query_plan(Order.objects.filter(user=self.request.user))
         return Order.objects.none()
 
     @action(detail=True, methods=["post"], parser_classes=[MultiPartParser, FormParser])
@@ -123,6 +335,42 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response({"id": order.id, "status": order.status}, status=200)
 
 
+class ReservationViewSet(viewsets.ViewSet):
+    """Short-lived cart holds; pass the returned id as `reservation` when placing the order."""
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [UserRateThrottle, ScopedRateThrottle]
+    throttle_scope = "reservations"
+
+    def create(self, request):
+        s = ReservationSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        quantities = OrderSerializer.merge_items(s.validated_data["items"])
+        try:
+            hold = get_reservation_store().hold(request.user.id, quantities)
+        except InsufficientStock as exc:
+            return Response({"stock": f"Insufficient stock for product {exc.product_id}."}, status=status.HTTP_409_CONFLICT)
+        except HoldLimitExceeded as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except ReservationsDisabled:
+            return Response({"detail": "Stock reservations are not available."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({
+            "reservation": hold["id"],
+            "expires_at": datetime.fromtimestamp(hold["expires_at"], tz=timezone.utc).isoformat(),
+            "items": [{"product_id": int(pid), "quantity": qty} for pid, qty in hold["items"].items()],
+        }, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, pk=None):
+        try:
+            store = get_reservation_store()
+        except ReservationsDisabled:
+            return Response({"detail": "Not found."}, status=404)
+        hold = store.get(pk)
+        if not hold or hold["user"] != request.user.id:
+            return Response({"detail": "Not found."}, status=404)
+        store.release(pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class ContactMessageViewSet(viewsets.ModelViewSet):
     queryset = ContactMessage.objects.all()
     serializer_class = ContactMessageSerializer
@@ -0,0 +1,81 @@
+"""
+Re-render hot catalog pages after an invalidation, before shoppers ask.
+
+Signals call schedule_catalog_warmup() after bumping a generation. One
+warm-up task is queued per CACHE_WARM_DEBOUNCE_SECONDS window, so a bulk
+admin edit only warms once. The task replays GETs through the full
+middleware stack with django.test.Client, so the page-cache keys (host,
+scheme, Vary'd headers) are the ones real clients will look up.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Category
+
+logger = logging.getLogger(__name__)
+
+WARM_PENDING_KEY = "catalog:warm:pending"
+
+
+def debounce_seconds() -> int:
+    return getattr(settings, "CACHE_WARM_DEBOUNCE_SECONDS", 10)
+
+
+def hot_catalog_urls() -> list:
+    """CACHE_WARM_URLS plus the first CACHE_WARM_CATEGORY_PAGES pages of each top-level category."""
+    urls = list(getattr(settings, "CACHE_WARM_URLS", ()))
+    pages = getattr(settings, "CACHE_WARM_CATEGORY_PAGES", 1)
+    template = getattr(settings, "CACHE_WARM_CATEGORY_URL", "/api/products/?category={id}&descendants=true")
+    if pages:
+        for category_id in Category.objects.filter(parent__isnull=True).order_by("name").values_list("id", flat=True):
+            first = template.format(id=category_id)
+            urls.append(first)
+            urls += [f"{first}&page={n}" for n in range(2, pages + 1)]
+    return urls
+
+
+def warm_catalog(urls=None) -> int:
+    """GET each URL so its response lands in the page cache; returns how many rendered."""
+    from django.test import Client
+
+    headers = {f"HTTP_{name.upper().replace('-', '_')}": value
+               for name, value in getattr(settings, "CACHE_WARM_HEADERS", {}).items() if value}
+    client = Client(HTTP_HOST=settings.CACHE_WARM_HOST, **headers)
+    secure = getattr(settings, "CACHE_WARM_SCHEME", "https") == "https"
+    warmed = 0
+    for url in hot_catalog_urls() if urls is None else urls:
+        try:
+            response = client.get(url, secure=secure)
+        except Exception:
+            logger.warning("Cache warm-up of %s failed", url, exc_info=True)
+            continue
+        if response.status_code == 200:
+            warmed += 1
+        else:
+            logger.info("Cache warm-up of %s returned %s", url, response.status_code)
+    return warmed
+
+
+def _enqueue():
+    from .tasks import warm_catalog_cache
+
+    try:
+        # Marker outlives the countdown in case the worker is slow to pick it up
+        if not cache.add(WARM_PENDING_KEY, 1, timeout=debounce_seconds() * 3):
+            return
+    except Exception:
+        logger.warning("Could not schedule catalog cache warm-up", exc_info=True)
+        return
+    try:
+        warm_catalog_cache.apply_async(countdown=debounce_seconds())
+    except Exception:
+        cache.delete(WARM_PENDING_KEY)
+        logger.warning("Could not schedule catalog cache warm-up", exc_info=True)
+
+
+def schedule_catalog_warmup() -> None:
+    if getattr(settings, "CACHE_WARM_ENABLED", False):
+        transaction.on_commit(_enqueue)
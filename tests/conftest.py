@@ -4,6 +4,16 @@ from rest_framework.test import APIClient
 from products.models import Category, Product
 
 
+@pytest.fixture(autouse=True)
+def _isolated_cache():
+    # Catalog pages and generation counters live in the process-wide cache
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -45,3 +55,28 @@ def product(db, category):
         category=category,
         stock=10,
     )
+
+
+@pytest.fixture
+def assert_constant_queries():
+    """
+    Return a helper that runs `request_fn(n)` for each size in `sizes` and
+    asserts the number of SQL queries does not grow with n. With
+    `writes_only=True` only non-SELECT statements are counted.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def _check(request_fn, sizes=(1, 5, 20), writes_only=False):
+        counts = []
+        for n in sizes:
+            with CaptureQueriesContext(connection) as ctx:
+                request_fn(n)
+            queries = ctx.captured_queries
+            if writes_only:
+                queries = [q for q in queries if not q["sql"].lstrip().upper().startswith("SELECT")]
+            counts.append(len(queries))
+        assert len(set(counts)) == 1, f"query count grows with page size: {dict(zip(sizes, counts))}"
+        return counts[0]
+
+    return _check
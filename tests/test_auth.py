@@ -1,5 +1,8 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from users.throttles import LoginRateThrottle
 
 
 @pytest.mark.django_db
@@ -28,3 +31,87 @@ def test_register_and_token_and_me(api_client):
     me = api_client.get("/api/auth/me/")
     assert me.status_code == 200
     assert me.data["username"] == "u1"
+
+
+@pytest.mark.django_db
+def test_authenticated_user_is_read_from_cache(auth_client, user, django_assert_num_queries, monkeypatch):
+    assert auth_client.get("/api/auth/me/").status_code == 200
+    with django_assert_num_queries(0):
+        me = auth_client.get("/api/auth/me/")
+    assert me.data["username"] == "tester"
+
+    # Any save drops the cached row
+    user.first_name = "Renamed"
+    user.save()
+    assert auth_client.get("/api/auth/me/").data["first_name"] == "Renamed"
+
+    # PIN reset goes through set_password + save
+    monkeypatch.setattr("auth_app.views.send_password_reset_notification.delay", lambda *a: None)
+    user.username = "+251911000000"
+    user.save()
+    auth_client.get("/api/auth/me/")
+    r = auth_client.post("/api/auth/reset-pin/", {"phone": user.username, "new_pin": "123456"}, format="json")
+    assert r.status_code == 204
+    from users.authentication import user_cache_key
+    from django.core.cache import cache
+    assert cache.get(user_cache_key(user.pk)) is None
+
+    user.is_active = False
+    user.save()
+    assert auth_client.get("/api/auth/me/").status_code == 401
+
+
+@pytest.mark.django_db
+def test_login_rehashes_with_preferred_hasher(api_client, settings):
+    settings.PASSWORD_HASHERS = [
+        "users.hashers.TunedScryptPasswordHasher",
+        "users.hashers.TunedPBKDF2PasswordHasher",
+    ]
+    settings.PASSWORD_SCRYPT_N = 2 ** 10
+    settings.PASSWORD_PBKDF2_ITERATIONS = 1000
+    user = get_user_model().objects.create_user(username="+251911000001")
+    user.password = make_password("482913", hasher="pbkdf2_sha256")
+    user.save()
+
+    r = api_client.post("/api/auth/token/", {"username": user.username, "password": "482913"}, format="json")
+    assert r.status_code == 200, r.content
+    user.refresh_from_db()
+    assert user.password.startswith("scrypt$1024$")
+
+    # Raising the cost upgrades again on the next login
+    settings.PASSWORD_SCRYPT_N = 2 ** 11
+    api_client.post("/api/auth/token/", {"username": user.username, "password": "482913"}, format="json")
+    user.refresh_from_db()
+    assert user.password.startswith("scrypt$2048$")
+
+
+@pytest.mark.django_db
+def test_pin_guessing_is_throttled_per_account(api_client, user, monkeypatch):
+    monkeypatch.setitem(LoginRateThrottle.THROTTLE_RATES, "login", "3/hour")
+    for pin in ("000000", "111111", "222222"):
+        r = api_client.post("/api/auth/token/", {"username": "Tester", "password": pin}, format="json")
+        assert r.status_code == 401
+    r = api_client.post("/api/auth/token/", {"username": "tester", "password": "Test12345!"}, format="json")
+    assert r.status_code == 429
+    # Other accounts are unaffected
+    other = api_client.post("/api/auth/token/", {"username": "someone", "password": "000000"}, format="json")
+    assert other.status_code == 401
+
+    monkeypatch.setitem(LoginRateThrottle.THROTTLE_RATES, "reset_pin", "1/hour")
+    monkeypatch.setattr("auth_app.views.send_password_reset_notification.delay", lambda *a: None)
+    reset = {"phone": "+251911000000", "new_pin": "123456"}
+    assert api_client.post("/api/auth/reset-pin/", reset, format="json").status_code == 404
+    assert api_client.post("/api/auth/reset-pin/", reset, format="json").status_code == 429
+
+
+def test_scrypt_hash_above_current_cost_still_verifies(settings):
+    from users.hashers import TunedScryptPasswordHasher
+
+    hasher = TunedScryptPasswordHasher()
+    # n=2**15, r=8 needs 32 MiB: over hashlib's default limit
+    settings.PASSWORD_SCRYPT_N = 2 ** 15
+    encoded = hasher.encode("482913", hasher.salt())
+    settings.PASSWORD_SCRYPT_N = 2 ** 10
+    assert hasher.verify("482913", encoded)
+    assert not hasher.verify("000000", encoded)
+    assert hasher.must_update(encoded)
@@ -0,0 +1,122 @@
+import multiprocessing
+import time
+import uuid
+
+import pytest
+from django.core.checks import run_checks
+from django.test import override_settings
+
+from ecommerce_backend.cache_backends import SQLiteCache, TieredCache
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path):
+    return SQLiteCache(str(tmp_path / "cache.sqlite3"), {})
+
+
+def _bump(path, n):
+    cache = SQLiteCache(path, {})
+    for _ in range(n):
+        cache.incr("gen")
+
+
+def test_sqlite_cache_basic_operations(sqlite_cache):
+    sqlite_cache.set("a", {"x": 1})
+    assert sqlite_cache.get("a") == {"x": 1}
+    assert sqlite_cache.add("a", 2) is False
+    assert sqlite_cache.add("b", 2) is True
+    assert sqlite_cache.get_many(["a", "b", "missing"]) == {"a": {"x": 1}, "b": 2}
+    assert sqlite_cache.incr("b", 3) == 5
+    with pytest.raises(ValueError):
+        sqlite_cache.incr("missing")
+
+    sqlite_cache.set("short", 1, timeout=0.05)
+    time.sleep(0.1)
+    assert sqlite_cache.get("short") is None
+    assert sqlite_cache.add("short", 2) is True
+
+    sqlite_cache.delete_many(["a", "b"])
+    assert not sqlite_cache.has_key("a")
+    sqlite_cache.clear()
+    assert sqlite_cache.get("short") is None
+
+
+def test_sqlite_cache_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path, {})
+    cache.set("gen", 0, None)
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_bump, args=(path, 50)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(30)
+    assert [w.exitcode for w in workers] == [0, 0, 0, 0]
+    assert cache.get("gen") == 200
+
+
+def test_sqlite_cache_culls_past_max_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), {"OPTIONS": {"MAX_ENTRIES": 50}})
+    for i in range(300):
+        cache.set(f"k{i}", i)
+    (count,) = cache._db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+    assert count < 300
+
+
+@pytest.fixture
+def tiered():
+    shared = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": uuid.uuid4().hex}
+    with override_settings(CACHES={"default": shared, "shared": shared}):
+        from django.core.cache import caches
+
+        options = {"SHARED": "shared", "MAX_ENTRIES": 3, "L1_PREFIXES": {"catalog:gen:": 0.05, "catalog:": 30}}
+        yield TieredCache(uuid.uuid4().hex, {"OPTIONS": options}), caches["shared"]
+
+
+def test_tiered_cache_serves_hot_keys_from_worker_memory(tiered):
+    l1, l2 = tiered
+    l2.set("catalog:page", {"rows": [1]})
+    assert l1.get("catalog:page") == {"rows": [1]}
+
+    # Another worker overwrote L2: this worker keeps its copy until the L1 TTL
+    l2.set("catalog:page", {"rows": [2]})
+    hit = l1.get("catalog:page")
+    assert hit == {"rows": [1]}
+    hit["rows"].append(99)  # callers get their own copy
+    assert l1.get("catalog:page") == {"rows": [1]}
+
+    # Keys outside the L1 prefixes always read through
+    l2.set("throttle_anon_1", [1])
+    assert l1.get("throttle_anon_1") == [1]
+    l2.set("throttle_anon_1", [1, 2])
+    assert l1.get("throttle_anon_1") == [1, 2]
+
+    # Bounded LRU
+    for i in range(5):
+        l1.set(f"catalog:k{i}", i)
+    l2.clear()
+    assert l1.get_many([f"catalog:k{i}" for i in range(5)]) == {"catalog:k2": 2, "catalog:k3": 3, "catalog:k4": 4}
+
+
+def test_tiered_cache_generation_bumps_reach_other_workers(tiered):
+    l1, l2 = tiered
+    l1.set("catalog:gen:products", 1, None)
+    assert l1.get_many(["catalog:gen:products"]) == {"catalog:gen:products": 1}
+    # Same worker: incr drops the local copy at once
+    assert l1.incr("catalog:gen:products") == 2
+    assert l1.get("catalog:gen:products") == 2
+    # Other worker's bump is seen once the short generation TTL lapses
+    l2.incr("catalog:gen:products")
+    time.sleep(0.1)
+    assert l1.get("catalog:gen:products") == 3
+
+
+def test_process_local_cache_warning(monkeypatch):
+    locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    with override_settings(CACHES=locmem):
+        assert "ecommerce_backend.W001" in [w.id for w in run_checks()]
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    with override_settings(CACHES=locmem, DEBUG=True):
+        assert "ecommerce_backend.W001" not in [w.id for w in run_checks()]
@@ -0,0 +1,147 @@
+import pytest
+from products.models import Category, Product
+from products.category_tree import compute_category_paths, rebuild_category_paths
+
+
+@pytest.mark.django_db
+def test_category_path_maintained_on_create_and_move():
+    root = Category.objects.create(name="Eyewear")
+    frames = Category.objects.create(name="Frames", parent=root)
+    metal = Category.objects.create(name="Metal", parent=frames)
+    assert metal.path == f"/{root.id}/{frames.id}/{metal.id}/"
+    assert metal.depth == 2
+
+    other = Category.objects.create(name="Sale")
+    frames.parent = other
+    frames.save()
+    metal.refresh_from_db()
+    assert metal.path == f"/{other.id}/{frames.id}/{metal.id}/"
+    assert metal.depth == 2
+    assert set(other.get_descendant_ids(include_self=False)) == {frames.id, metal.id}
+
+
+@pytest.mark.django_db
+def test_rebuild_recovers_paths():
+    root = Category.objects.create(name="Eyewear")
+    child = Category.objects.create(name="Lenses", parent=root)
+    Category.objects.update(path="", depth=0)
+    assert rebuild_category_paths(Category) == 2
+    child.refresh_from_db()
+    assert child.path == f"/{root.id}/{child.id}/"
+    assert child.depth == 1
+
+
+def test_compute_paths_breaks_cycles():
+    paths = compute_category_paths({1: None, 2: 1, 3: 4, 4: 3})
+    assert paths[2] == ("/1/2/", 1)
+    assert {paths[3][1], paths[4][1]} == {0, 1}
+
+
+@pytest.mark.django_db
+def test_descendant_filter_uses_subtree(api_client):
+    root = Category.objects.create(name="Eyewear")
+    child = Category.objects.create(name="Frames", parent=root)
+    leaf = Category.objects.create(name="Metal", parent=child)
+    other = Category.objects.create(name="Gifts")
+    for cat in (root, child, leaf, other):
+        Product.objects.create(title=cat.name, price=1, category=cat, stock=1)
+
+    r = api_client.get(f"/api/products/?category={child.id}&descendants=true")
+    assert {p["title"] for p in r.data["results"]} == {"Frames", "Metal"}
+
+
+@pytest.mark.django_db
+def test_category_tree_endpoint_with_etag(api_client, django_capture_on_commit_callbacks):
+    root = Category.objects.create(name="Eyewear")
+    child = Category.objects.create(name="Frames", parent=root)
+
+    r = api_client.get("/api/categories/tree/")
+    assert r.status_code == 200
+    tree = r.json()
+    assert [n["id"] for n in tree] == [root.id]
+    assert tree[0]["children"][0]["id"] == child.id
+    assert tree[0]["children_count"] == 1
+
+    etag = r["ETag"]
+    r304 = api_client.get("/api/categories/tree/", HTTP_IF_NONE_MATCH=etag)
+    assert r304.status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Category.objects.create(name="Lenses", parent=root)
+    r2 = api_client.get("/api/categories/tree/", HTTP_IF_NONE_MATCH=etag)
+    assert r2.status_code == 200
+    assert r2.json()[0]["children_count"] == 2
+
+
+@pytest.mark.django_db
+def test_category_list_conditional_get(api_client, django_capture_on_commit_callbacks, django_assert_num_queries):
+    root = Category.objects.create(name="Eyewear")
+
+    r = api_client.get("/api/categories/")
+    etag = r["ETag"]
+    with django_assert_num_queries(0):
+        r304 = api_client.get("/api/categories/", HTTP_IF_NONE_MATCH=etag)
+    assert r304.status_code == 304
+    assert r304["ETag"] == etag
+
+    # Other representations get their own ETag
+    assert api_client.get(f"/api/categories/?parent={root.id}")["ETag"] != etag
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Category.objects.create(name="Lenses")
+    assert api_client.get("/api/categories/", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_category_list_stale_while_revalidate(api_client, settings, monkeypatch, django_assert_num_queries):
+    from types import SimpleNamespace
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    import products.cache as catalog_cache
+
+    Category.objects.create(name="Eyewear")
+    clock = SimpleNamespace(now=1_000_000.0)
+    fake_time = SimpleNamespace(time=lambda: clock.now, sleep=lambda s: setattr(clock, "now", clock.now + s))
+    monkeypatch.setattr(catalog_cache, "time", fake_time)
+
+    assert api_client.get("/api/categories/").status_code == 200
+    clock.now += settings.CACHE_TTL + 1
+
+    # Another worker holds the refresh lock: the stale page is served as is
+    monkeypatch.setattr(catalog_cache, "_acquire", lambda key: False)
+    with django_assert_num_queries(0):
+        assert api_client.get("/api/categories/").json()["results"][0]["name"] == "Eyewear"
+
+    # Cold miss while someone else renders: wait up to CACHE_LOCK_WAIT_SECONDS, then render
+    catalog_cache.bump_generation(catalog_cache.CATEGORIES)
+    started = clock.now
+    assert api_client.get("/api/categories/").status_code == 200
+    assert clock.now - started >= settings.CACHE_LOCK_WAIT_SECONDS
+
+    # The lock winner refreshes, after which the page is fresh again
+    monkeypatch.undo()
+    monkeypatch.setattr(catalog_cache, "time", fake_time)
+    clock.now += settings.CACHE_TTL + 1
+    with CaptureQueriesContext(connection) as refreshed:
+        api_client.get("/api/categories/")
+    assert len(refreshed) > 0
+    with django_assert_num_queries(0):
+        api_client.get("/api/categories/")
+
+
+@pytest.mark.django_db
+def test_category_cannot_be_moved_under_itself_via_api(api_client):
+    from django.contrib.auth import get_user_model
+
+    admin = get_user_model().objects.create_user(username="boss", is_admin=True)
+    api_client.force_authenticate(admin)
+    root = Category.objects.create(name="Eyewear")
+    child = Category.objects.create(name="Frames", parent=root)
+    grandchild = Category.objects.create(name="Metal", parent=child)
+
+    for parent in (root, child, grandchild):
+        r = api_client.patch(f"/api/categories/{root.id}/", {"parent": parent.id}, format="json")
+        assert r.status_code == 400, r.content
+        assert "parent" in r.data
+    root.refresh_from_db()
+    assert root.parent_id is None
@@ -0,0 +1,94 @@
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from auth_app import google
+
+
+@pytest.fixture
+def signing_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def jwks_file(tmp_path, signing_key, settings):
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(signing_key.public_key()))
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [{**jwk, "kid": "k1", "alg": "RS256", "use": "sig"}]}))
+    settings.GOOGLE_JWKS_SOURCE = str(path)
+    return path
+
+
+def id_token(key, kid="k1", **claims):
+    now = int(time.time())
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": "web-client",
+        "sub": "1234",
+        "email": "shopper@example.com",
+        "email_verified": True,
+        "name": "Abebe Kebede",
+        "iat": now,
+        "exp": now + 600,
+        **claims,
+    }
+    return jwt.encode(payload, key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.mark.django_db
+def test_google_sign_in_verifies_token_locally(api_client, jwks_file, signing_key, monkeypatch):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID_WEB", "web-client")
+    monkeypatch.setattr("requests.get", lambda *a, **kw: pytest.fail("no remote call expected"))
+
+    r = api_client.post("/api/auth/google/", {"id_token": id_token(signing_key)}, format="json")
+    assert r.status_code == 200, r.content
+    assert r.data["user"]["email"] == "shopper@example.com"
+    assert r.data["user"]["first_name"] == "Abebe"
+
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    bad = [
+        id_token(other_key),
+        id_token(signing_key, aud="someone-else"),
+        id_token(signing_key, exp=int(time.time()) - 3600),
+        id_token(signing_key, iss="https://evil.example.com"),
+        id_token(signing_key, kid="unknown"),
+        "not-a-jwt",
+    ]
+    for token in bad:
+        assert api_client.post("/api/auth/google/", {"id_token": token}, format="json").status_code == 400
+    r = api_client.post("/api/auth/google/", {"id_token": id_token(signing_key, aud="someone-else")}, format="json")
+    assert r.data["detail"] == "Token audience mismatch"
+
+
+def test_url_key_source_honors_max_age(monkeypatch, signing_key):
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(signing_key.public_key()))
+    calls = []
+
+    class FakeResponse:
+        headers = {"Cache-Control": "public, max-age=100, must-revalidate"}
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"keys": [{**jwk, "kid": "k1", "alg": "RS256"}]}
+
+    monkeypatch.setattr(google.requests, "get", lambda url, timeout: calls.append(url) or FakeResponse())
+    clock = [1000.0]
+    monkeypatch.setattr(google.time, "monotonic", lambda: clock[0])
+
+    keys = google.KeyCache(google.URLKeySource("https://example.com/certs"))
+    keys.get("k1")
+    keys.get("k1")
+    assert len(calls) == 1
+    # Unknown kids refetch at most once per min_refresh_interval
+    for _ in range(3):
+        with pytest.raises(google.GoogleTokenError):
+            keys.get("rotated")
+    assert len(calls) == 1
+    clock[0] += 101
+    keys.get("k1")
+    assert len(calls) == 2
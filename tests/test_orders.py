@@ -36,3 +36,273 @@ def test_orders_insufficient_stock_fails(auth_client, product):
     # ensure stock unchanged
     product.refresh_from_db()
     assert product.stock == 10
+
+
+@pytest.mark.django_db
+def test_order_history_query_count_is_constant(api_client, category, assert_constant_queries):
+    from django.contrib.auth import get_user_model
+    from products.models import Order, OrderItem, ProductImage
+
+    products = []
+    for i in range(6):
+        p = Product.objects.create(title=f"Frame {i}", price=20, category=category, stock=50)
+        ProductImage.objects.create(product=p, url=f"https://res.cloudinary.com/x/image/upload/{i}.jpg")
+        products.append(p)
+
+    # One buyer per size with n orders of n items each
+    buyers = {}
+    for n in (1, 3, 6):
+        buyers[n] = get_user_model().objects.create_user(username=f"buyer{n}")
+        for _ in range(n):
+            order = Order.objects.create(user=buyers[n])
+            for p in products[:n]:
+                OrderItem.objects.create(order=order, product=p, quantity=1)
+
+    def list_orders(n):
+        api_client.force_authenticate(buyers[n])
+        r = api_client.get("/api/orders/")
+        assert r.status_code == 200
+        assert len(r.data["results"]) == n
+        item = r.data["results"][0]["items"][0]
+        assert set(item["product"]) == {"id", "title", "price", "image_url", "category", "images"}
+
+    assert_constant_queries(list_orders, sizes=(1, 3, 6))
+
+    # The nested product is trimmed in SQL too, not just in the serializer
+    from products.views import order_items_prefetch
+    sql = str(order_items_prefetch().queryset.query)
+    assert "search_vector" not in sql and "description" not in sql
+
+
+@pytest.mark.django_db
+def test_orders_merge_duplicate_lines_in_constant_statements(auth_client, category, assert_constant_queries):
+    products = [Product.objects.create(title=f"Frame {i}", price=20, category=category, stock=10) for i in range(8)]
+
+    def place_order(n):
+        items = [{"product_id": p.id, "quantity": 1} for p in products[:n]]
+        items.append({"product_id": products[0].id, "quantity": 2})
+        r = auth_client.post("/api/orders/", {"items": items}, format="json")
+        assert r.status_code == 201, r.content
+        assert len(r.data["items"]) == n
+
+    # product_id validation reads each product; the writes must not grow
+    assert_constant_queries(place_order, sizes=(1, 4, 8), writes_only=True)
+
+    products[0].refresh_from_db()
+    assert products[0].stock == 10 - 3 * 3
+
+
+@pytest.mark.django_db
+def test_reservation_hold_blocks_others_and_confirms_into_order(
+    auth_client, product, django_capture_on_commit_callbacks, monkeypatch
+):
+    monkeypatch.setattr("products.serializers.send_order_telegram.delay", lambda *a, **k: None)
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from products.reservations import get_reservation_store
+
+    r = auth_client.post("/api/reservations/", {"items": [{"product_id": product.id, "quantity": 8}]}, format="json")
+    assert r.status_code == 201, r.content
+    hold_id = r.data["reservation"]
+
+    # another shopper can only get what isn't held
+    other = get_user_model().objects.create_user(username="other", password="x")
+    other_client = APIClient()
+    other_client.force_authenticate(other)
+    r2 = other_client.post("/api/orders/", {"items": [{"product_id": product.id, "quantity": 3}]}, format="json")
+    assert r2.status_code == 400
+    r3 = other_client.post("/api/reservations/", {"items": [{"product_id": product.id, "quantity": 3}]}, format="json")
+    assert r3.status_code == 409
+
+    with django_capture_on_commit_callbacks(execute=True):
+        r4 = auth_client.post("/api/orders/", {"reservation": hold_id}, format="json")
+    assert r4.status_code == 201, r4.content
+    assert r4.data["items"][0]["quantity"] == 8
+    product.refresh_from_db()
+    assert product.stock == 2
+    assert get_reservation_store().held([product.id]) == {product.id: 0}
+    # a hold can only be used once
+    assert auth_client.post("/api/orders/", {"reservation": hold_id}, format="json").status_code == 400
+
+
+@pytest.mark.django_db
+def test_expired_reservations_are_released(auth_client, product):
+    import time
+    from products.reservations import get_reservation_store
+    from products.tasks import release_expired_reservations
+
+    store = get_reservation_store()
+    store.hold(user_id=1, quantities={product.id: 10}, ttl=1)
+    assert store.held([product.id]) == {product.id: 10}
+    assert store.release_expired(now=time.time() + 5) == 1
+    assert store.held([product.id]) == {product.id: 0}
+    assert release_expired_reservations() == 0
+
+
+@pytest.mark.django_db
+def test_expired_holds_are_swept_without_beat(product, monkeypatch):
+    import time
+    from products import reservations
+
+    store = reservations.get_reservation_store()
+    store.hold(user_id=1, quantities={product.id: 10}, ttl=60)
+    with pytest.raises(reservations.InsufficientStock):
+        store.hold(user_id=2, quantities={product.id: 1})
+    # An hour later the next hold finds the old one expired and returns its units
+    now = time.time() + 3600
+    monkeypatch.setattr(reservations.time, "time", lambda: now)
+    assert store.hold(user_id=2, quantities={product.id: 4})["items"] == {str(product.id): 4}
+    assert store.held([product.id]) == {product.id: 4}
+
+
+@pytest.mark.django_db
+def test_own_holds_do_not_block_a_direct_order(auth_client, user, product, monkeypatch):
+    monkeypatch.setattr("products.serializers.send_order_telegram.delay", lambda *a, **k: None)
+    from products.reservations import get_reservation_store
+
+    get_reservation_store().hold(user.id, {product.id: 8})
+    r = auth_client.post("/api/orders/", {"items": [{"product_id": product.id, "quantity": 9}]}, format="json")
+    assert r.status_code == 201, r.content
+    r = auth_client.post("/api/orders/", {"items": [{"product_id": product.id, "quantity": 2}]}, format="json")
+    assert r.status_code == 400
+
+
+@pytest.mark.django_db
+def test_reservations_are_capped_per_user(auth_client, category, settings, monkeypatch):
+    from rest_framework.throttling import ScopedRateThrottle
+
+    settings.RESERVATION_MAX_HOLDS_PER_USER = 2
+    settings.RESERVATION_MAX_UNITS_PER_USER = 5
+    a, b, c = [Product.objects.create(title=f"Frame {i}", price=20, category=category, stock=50) for i in range(3)]
+
+    def reserve(product, quantity):
+        return auth_client.post("/api/reservations/", {"items": [{"product_id": product.id, "quantity": quantity}]}, format="json")
+
+    assert reserve(a, 6).status_code == 400  # over the unit cap on its own
+    assert reserve(a, 3).status_code == 201
+    assert reserve(b, 3).status_code == 400  # 6 units across holds
+    assert reserve(b, 2).status_code == 201
+    assert reserve(c, 1).status_code == 400  # third active hold
+
+    monkeypatch.setitem(ScopedRateThrottle.THROTTLE_RATES, "reservations", "1/hour")
+    assert reserve(c, 1).status_code == 429
+
+
+def test_local_reservations_refused_on_a_shared_cache(settings, tmp_path):
+    from django.core.exceptions import ImproperlyConfigured
+    from products.reservations import ReservationsDisabled, build_reservation_store
+
+    settings.RESERVATION_BACKEND = "local"
+    settings.CACHES = {"default": {
+        "BACKEND": "ecommerce_backend.cache_backends.SQLiteCache",
+        "LOCATION": str(tmp_path / "cache.sqlite3"),
+    }}
+    with pytest.raises(ImproperlyConfigured):
+        build_reservation_store()
+    settings.RESERVATION_BACKEND = "off"
+    with pytest.raises(ReservationsDisabled):
+        build_reservation_store()
+
+
+@pytest.mark.django_db
+def test_order_snapshots_prices_and_totals(auth_client, product, category):
+    from django.core.management import call_command
+    from products.models import Order, OrderItem
+
+    r = auth_client.post("/api/orders/", {"items": [{"product_id": product.id, "quantity": 2}]}, format="json")
+    assert r.status_code == 201, r.content
+    assert r.data["total_amount"] == "999.98"
+    assert r.data["item_count"] == 1
+    assert r.data["items"][0]["unit_price"] == "499.99"
+
+    # later price changes don't rewrite history
+    product.price = 10
+    product.save()
+    order = Order.objects.get(pk=r.data["id"])
+    assert str(order.total_amount) == "999.98"
+
+    # legacy rows without a snapshot are filled by the backfill command
+    legacy = Order.objects.create(user=order.user)
+    OrderItem.objects.create(order=legacy, product=product, quantity=3)
+    # items priced by an earlier run, but the total never written
+    partial = Order.objects.create(user=order.user, item_count=1)
+    OrderItem.objects.create(order=partial, product=product, quantity=2, unit_price=5)
+    call_command("backfill_order_totals")
+    legacy.refresh_from_db()
+    assert str(legacy.total_amount) == "30.00"
+    assert legacy.item_count == 1
+    partial.refresh_from_db()
+    assert str(partial.total_amount) == "10.00"
+    order.refresh_from_db()
+    assert str(order.total_amount) == "999.98"
+
+
+@pytest.mark.django_db
+def test_admin_order_changelists_query_count_is_constant(client, category, settings):
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from products.models import Order, OrderItem
+
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+    admin = get_user_model().objects.create_superuser(username="boss", password="x", email="b@example.com")
+    client.force_login(admin)
+    products = [Product.objects.create(title=f"Frame {i}", price=20, category=category, stock=5) for i in range(3)]
+
+    for url in ("/admin/products/order/", "/admin/products/orderitem/"):
+        counts = []
+        for n in (1, 5):
+            for _ in range(n):
+                order = Order.objects.create(user=admin)
+                for p in products:
+                    OrderItem.objects.create(order=order, product=p, quantity=2, unit_price=p.price)
+            with CaptureQueriesContext(connection) as ctx:
+                r = client.get(url)
+            assert r.status_code == 200
+            counts.append(len(ctx.captured_queries))
+        assert counts[0] == counts[1], (url, counts)
+
+    assert client.get(f"/admin/products/order/{order.pk}/change/").status_code == 200
+
+
+@pytest.mark.django_db
+def test_admin_inline_edits_snapshot_prices_and_recompute_totals(client, category, settings):
+    from django.contrib.auth import get_user_model
+    from products.models import Order
+
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+    admin = get_user_model().objects.create_superuser(username="boss", password="x", email="b@example.com")
+    client.force_login(admin)
+    cheap = Product.objects.create(title="Cheap", price=20, category=category, stock=5)
+    dear = Product.objects.create(title="Dear", price=150, category=category, stock=5)
+
+    inline = {"items-TOTAL_FORMS": "2", "items-INITIAL_FORMS": "0", "items-MIN_NUM_FORMS": "0", "items-MAX_NUM_FORMS": "1000"}
+    r = client.post("/admin/products/order/add/", {
+        "user": admin.pk, "status": "PENDING", "delivery_address": "", "payment_proof_url": "",
+        **inline,
+        "items-0-product": cheap.pk, "items-0-quantity": "2",
+        "items-1-product": dear.pk, "items-1-quantity": "1",
+    })
+    assert r.status_code == 302, r.content
+    order = Order.objects.get()
+    assert (str(order.total_amount), order.item_count) == ("190.00", 2)
+    assert sorted(str(i.unit_price) for i in order.items.all()) == ["150.00", "20.00"]
+
+    # Swapping a row's product reprices it; deleting a row drops it from the total
+    first, second = order.items.order_by("id")
+    r = client.post(f"/admin/products/order/{order.pk}/change/", {
+        "user": admin.pk, "status": "PENDING", "delivery_address": "", "payment_proof_url": "",
+        **inline, "items-INITIAL_FORMS": "2",
+        "items-0-id": first.pk, "items-0-order": order.pk, "items-0-product": dear.pk, "items-0-quantity": "2",
+        "items-1-id": second.pk, "items-1-order": order.pk, "items-1-product": dear.pk, "items-1-quantity": "1",
+        "items-1-DELETE": "on",
+    })
+    assert r.status_code == 302, r.content
+    order.refresh_from_db()
+    assert (str(order.total_amount), order.item_count) == ("300.00", 1)
@@ -24,3 +24,292 @@ def test_products_list_and_filters(api_client, category, product):
     # ordering and search
     r5 = api_client.get("/api/products/?ordering=-created_at&search=phone")
     assert r5.status_code == 200
+
+
+@pytest.mark.django_db
+def test_products_list_query_count_is_constant(api_client, category, assert_constant_queries):
+    from django.core.cache import cache
+    from products.models import Product, ProductImage
+
+    for i in range(20):
+        p = Product.objects.create(title=f"Frame {i}", price=10 + i, category=category, stock=3)
+        for order in range(3):
+            ProductImage.objects.create(product=p, url=f"https://res.cloudinary.com/x/image/upload/{i}_{order}.jpg", sort_order=order)
+
+    def fetch(n):
+        cache.clear()
+        r = api_client.get(f"/api/products/?page_size={n}")
+        assert r.status_code == 200
+        assert len(r.data["results"]) == n
+
+    assert_constant_queries(fetch)
+
+    r = api_client.get("/api/products/featured/")
+    assert r.status_code == 200
+
+
+@pytest.mark.django_db
+def test_product_save_invalidates_catalog_without_flushing_cache(
+    api_client, category, product, django_capture_on_commit_callbacks
+):
+    from django.core.cache import cache
+
+    cache.set("unrelated:key", "keep-me", 300)
+    r1 = api_client.get("/api/products/")
+    assert r1.data["results"][0]["title"] == "Phone"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.title = "Phone X"
+        product.save()
+
+    r2 = api_client.get("/api/products/")
+    assert r2.data["results"][0]["title"] == "Phone X"
+    assert cache.get("unrelated:key") == "keep-me"
+
+
+@pytest.mark.django_db
+def test_stock_only_save_keeps_listing_cached_but_serves_live_stock(
+    api_client, category, product, django_capture_on_commit_callbacks
+):
+    from products.cache import PRODUCTS, get_generations
+    from products.models import Product
+
+    r1 = api_client.get("/api/products/")
+    assert r1.data["results"][0]["stock"] == 10
+    gen = get_generations([PRODUCTS])[PRODUCTS]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        p = Product.objects.get(pk=product.pk)
+        p.stock = 4
+        p.save()
+
+    assert get_generations([PRODUCTS])[PRODUCTS] == gen
+    r2 = api_client.get("/api/products/")
+    assert r2.json()["results"][0]["stock"] == 4
+
+    r3 = api_client.get(f"/api/products/availability/?ids={product.pk}")
+    assert r3.data["results"] == [{"id": product.pk, "stock": 4, "in_stock": True}]
+
+
+@pytest.mark.django_db
+def test_successive_saves_classify_changes_against_the_last_write(category, django_capture_on_commit_callbacks):
+    from products.cache import PRODUCTS, get_generations
+    from products.models import Product
+
+    def saved(p):
+        gen = get_generations([PRODUCTS])[PRODUCTS]
+        with django_capture_on_commit_callbacks(execute=True):
+            p.save()
+        return get_generations([PRODUCTS])[PRODUCTS] != gen  # True when listings were invalidated
+
+    p = Product.objects.create(title="Phone", price=10, category=category, stock=10)
+    p.stock = 9
+    assert saved(p) is False
+    p.title = "Phone X"
+    assert saved(p) is True
+    p.stock = 8
+    assert saved(p) is False
+
+    # Another writer renamed it; writing the old title back is a catalog edit
+    Product.objects.filter(pk=p.pk).update(title="Renamed")
+    p.refresh_from_db()
+    p.title = "Phone X"
+    assert saved(p) is True
+
+
+@pytest.mark.django_db
+def test_search_falls_back_to_icontains_off_postgres(api_client, category, product):
+    from products.models import Product
+
+    Product.objects.create(title="Aviator frame", description="metal", price=80, category=category, stock=1)
+    r = api_client.get("/api/products/?search=aviator")
+    assert r.status_code == 200
+    assert [p["title"] for p in r.data["results"]] == ["Aviator frame"]
+
+
+@pytest.mark.django_db
+def test_suggest_tolerates_typos(api_client, category):
+    from products.models import Product
+
+    aviator = Product.objects.create(title="Ray-Ban Aviator Classic", price=150, category=category, stock=2)
+    Product.objects.create(title="Oakley Holbrook", price=120, category=category, stock=2)
+
+    r = api_client.get("/api/products/suggest/?q=aviater")
+    assert r.status_code == 200
+    assert [s["id"] for s in r.data["results"]] == [aviator.id]
+
+    assert api_client.get("/api/products/suggest/?q=a").data["results"] == []
+
+
+@pytest.mark.django_db
+def test_keyset_pagination_walks_all_products(api_client, category):
+    from products.models import Product
+
+    for i in range(7):
+        Product.objects.create(title=f"Frame {i}", price=10 + (i % 3), category=category, stock=1)
+
+    for ordering in ("-created_at", "price", "-price"):
+        url = f"/api/products/?pagination=cursor&page_size=3&ordering={ordering}"
+        seen = []
+        first = True
+        while url:
+            r = api_client.get(url + ("&count=true" if first else ""))
+            assert r.status_code == 200
+            assert ("count" in r.data) == first
+            first = False
+            seen.extend(p["id"] for p in r.data["results"])
+            url = r.data["next"]
+        assert len(seen) == len(set(seen)) == 7
+        if ordering == "price":
+            prices = [Product.objects.get(pk=pk).price for pk in seen]
+            assert prices == sorted(prices)
+
+    assert api_client.get("/api/products/?cursor=garbage").status_code == 404
+
+
+@pytest.mark.django_db
+def test_image_variants_are_stored_and_backfilled(api_client, product):
+    from django.core.management import call_command
+    from products.models import ProductImage
+
+    url = "https://res.cloudinary.com/demo/image/upload/v1/frame.jpg"
+    img = ProductImage.objects.create(product=product, url=url)
+    assert img.variants["thumb"] == "https://res.cloudinary.com/demo/image/upload/f_auto,q_auto:eco,c_limit,dpr_auto,w_240/v1/frame.jpg"
+
+    ProductImage.objects.filter(pk=img.pk).update(variants={})
+    r = api_client.get(f"/api/products/{product.pk}/")
+    assert r.data["images"][0]["thumb"] == img.variants["thumb"]
+
+    call_command("backfill_image_variants")
+    img.refresh_from_db()
+    assert set(img.variants) == {"orig", "tiny", "thumb", "medium", "full", "hero"}
+
+
+@pytest.mark.django_db
+def test_sparse_fieldsets_trim_payload_and_queries(api_client, category, product, django_assert_num_queries):
+    from products.models import ProductImage
+
+    ProductImage.objects.create(product=product, url="https://res.cloudinary.com/demo/image/upload/v1/a.jpg")
+
+    # count + page, no category join and no image prefetch
+    with django_assert_num_queries(2) as ctx:
+        r = api_client.get("/api/products/?fields=id,title,price,stock,category")
+    assert r.status_code == 200
+    row = r.data["results"][0]
+    assert set(row) == {"id", "title", "price", "stock", "category"}
+    assert row["category"] == category.pk
+    page_sql = ctx.captured_queries[-1]["sql"]
+    assert "description" not in page_sql and "products_category" not in page_sql
+
+    r = api_client.get("/api/products/?fields=id,category,images.thumb&expand=category")
+    row = r.data["results"][0]
+    assert row["category"]["name"] == category.name
+    assert set(row["images"][0]) == {"thumb"}
+
+    r = api_client.get(f"/api/products/{product.pk}/?fields=id,title")
+    assert r.data == {"id": product.pk, "title": product.title}
+
+    # Without ?fields= the full shape is unchanged
+    r = api_client.get(f"/api/products/{product.pk}/")
+    assert "description" in r.data and r.data["category"]["id"] == category.pk
+
+
+@pytest.mark.django_db
+def test_cards_match_list_shape(api_client, category, product, django_assert_num_queries):
+    from products.models import Category, Product, ProductImage
+
+    ProductImage.objects.create(product=product, url="https://res.cloudinary.com/demo/image/upload/v1/a.jpg")
+    Product.objects.create(title="Cable", price="7.50", stock=0, category=category, image_url="https://res.cloudinary.com/demo/image/upload/c.jpg")
+    Product.objects.create(title="Lens", price=12, category=Category.objects.create(name="Optics", parent=category))
+
+    for query in ("", "?ordering=price", "?category=%d" % category.pk, "?pagination=cursor&ordering=price&page_size=2"):
+        expected = api_client.get(f"/api/products/{query}").json()
+        # count + page + images
+        with django_assert_num_queries(2 if "cursor" in query else 3):
+            r = api_client.get(f"/api/products/cards/{query}")
+        assert r.status_code == 200
+        data = r.json()
+        # Same payload; only the pagination links point back at /cards/
+        for link in ("next", "previous"):
+            if data.get(link):
+                data[link] = data[link].replace("/cards/", "/")
+        assert data == expected
+
+
+@pytest.mark.django_db
+def test_product_detail_conditional_get(api_client, product, django_assert_num_queries, django_capture_on_commit_callbacks):
+    from products.models import Product, ProductImage
+
+    url = f"/api/products/{product.pk}/"
+    r = api_client.get(url)
+    etag, last_modified = r["ETag"], r["Last-Modified"]
+
+    # One indexed lookup, no serialization
+    with django_assert_num_queries(1):
+        r304 = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert r304.status_code == 304
+    assert api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+
+    Product.objects.filter(pk=product.pk).update(stock=3)
+    r = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert r.status_code == 200 and r.data["stock"] == 3
+    etag = r["ETag"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ProductImage.objects.create(product=product, url="https://res.cloudinary.com/demo/image/upload/v1/a.jpg")
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    assert api_client.get("/api/products/999999/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_product_detail_is_modified_by_a_category_rename(api_client, product, django_capture_on_commit_callbacks):
+    import datetime
+
+    from django.utils import timezone
+
+    from products.models import Category
+
+    url = f"/api/products/{product.pk}/"
+    last_modified = api_client.get(url)["Last-Modified"]
+
+    # HTTP dates have one-second resolution, so push the rename past it
+    with django_capture_on_commit_callbacks(execute=True):
+        category = product.category
+        category.name = "Optical"
+        category.save()
+    Category.objects.filter(pk=category.pk).update(updated_at=timezone.now() + datetime.timedelta(minutes=1))
+
+    r = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert r.status_code == 200
+    assert r.data["category"]["name"] == "Optical"
+
+
+@pytest.mark.django_db
+def test_catalog_warmup_is_debounced_and_fills_page_cache(
+    api_client, category, settings, monkeypatch, django_capture_on_commit_callbacks, django_assert_num_queries
+):
+    from products import tasks
+    from products.models import Product
+    from products.warmup import hot_catalog_urls
+
+    settings.CACHE_WARM_ENABLED = True
+    settings.CACHE_WARM_HOST, settings.CACHE_WARM_SCHEME, settings.CACHE_WARM_HEADERS = "testserver", "http", {}
+    queued = []
+    monkeypatch.setattr(tasks.warm_catalog_cache, "apply_async", lambda **kw: queued.append(kw))
+
+    # A bulk edit queues a single warm-up
+    with django_capture_on_commit_callbacks(execute=True):
+        for i in range(5):
+            Product.objects.create(title=f"Frame {i}", price=10, category=category)
+    assert queued == [{"countdown": settings.CACHE_WARM_DEBOUNCE_SECONDS}]
+    assert f"/api/products/?category={category.pk}&descendants=true" in hot_catalog_urls()
+
+    assert tasks.warm_catalog_cache() == len(hot_catalog_urls())
+    with django_assert_num_queries(0):
+        assert api_client.get("/api/categories/").status_code == 200
+
+    # The task cleared the debounce marker: the next edit queues again
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.create(title="Frame 9", price=10, category=category)
+    assert len(queued) == 2
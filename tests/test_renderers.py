@@ -0,0 +1,66 @@
+import datetime
+import decimal
+import io
+import uuid
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from ecommerce_backend import renderers
+from ecommerce_backend.renderers import FastJSONParser, FastJSONRenderer
+
+
+def payload():
+    utc = datetime.timezone.utc
+    return {
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "price": decimal.Decimal("499.99"),
+        "created_at": datetime.datetime(2026, 10, 18, 10, 9, 1, 123456, tzinfo=utc),
+        "paid_at": datetime.datetime(2026, 10, 18, 10, 9, 1, tzinfo=utc),
+        "naive": datetime.datetime(2026, 10, 18, 10, 9),
+        "day": datetime.date(2026, 10, 18),
+        "opens": datetime.time(9, 30, 0, 250500),
+        "local": datetime.datetime(2026, 10, 18, 13, 9, 1, 987654, tzinfo=datetime.timezone(datetime.timedelta(hours=3))),
+        "ttl": datetime.timedelta(minutes=10),
+        "label": gettext_lazy("Pending"),
+        "title": "Lunettes été \u2028\u2029 \U0001f576",
+        "counts": {1: 2},
+        "items": [{"qty": 2, "ok": True, "note": None, "ratio": 0.25}],
+    }
+
+
+def test_fast_renderer_matches_drf_output():
+    assert FastJSONRenderer().render(payload()) == JSONRenderer().render(payload())
+    assert FastJSONRenderer().render(None) == b""
+    # Indented output (browsable API, ?indent) goes through stdlib json
+    indented = FastJSONRenderer().render(payload(), "application/json; indent=2")
+    assert indented == JSONRenderer().render(payload(), "application/json; indent=2")
+
+
+def test_dates_and_times_are_formatted_by_drf(monkeypatch):
+    calls = []
+    monkeypatch.setattr(renderers, "_default", lambda obj: calls.append(obj) or "drf")
+    value = datetime.datetime(2026, 10, 18, 10, 9, 1, 123456, tzinfo=datetime.timezone.utc)
+    assert FastJSONRenderer().render({"at": value, "t": value.time()}) == b'{"at":"drf","t":"drf"}'
+    assert calls == [value, value.time()]
+
+
+def test_falls_back_without_orjson(monkeypatch):
+    monkeypatch.setattr(renderers, "orjson", None)
+    assert FastJSONRenderer().render(payload()) == JSONRenderer().render(payload())
+    assert FastJSONParser().parse(io.BytesIO(b'{"a": [1]}')) == {"a": [1]}
+
+
+def test_fast_parser():
+    assert FastJSONParser().parse(io.BytesIO('{"title": "été", "qty": 2}'.encode())) == {"title": "été", "qty": 2}
+    with pytest.raises(ParseError):
+        FastJSONParser().parse(io.BytesIO(b"{bad"))
+
+
+@pytest.mark.django_db
+def test_api_uses_fast_renderer(api_client, product):
+    r = api_client.get(f"/api/products/{product.pk}/")
+    assert isinstance(r.accepted_renderer, FastJSONRenderer)
+    assert r.json()["price"] == "499.99"
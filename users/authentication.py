@@ -0,0 +1,68 @@
+"""
+JWT authentication that reads the user through the cache.
+
+simplejwt looks the user up on every authenticated request. Here the user's
+non-secret columns are cached per id for AUTH_USER_CACHE_SECONDS, and
+request.user is rebuilt from them with Model.from_db(): the password and any
+other column left out are deferred, so they (and save()) still go to the DB
+if something actually needs them.
+
+Entries are dropped by users.signals on every User save/delete, which covers
+profile edits, ResetPinView's set_password + save and is_active changes made
+through the model. Bulk queryset.update() calls bypass signals; they are
+picked up when the entry expires.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+USER_CACHE_KEY = "auth:user:{}"
+
+
+def user_cache_key(user_id) -> str:
+    return USER_CACHE_KEY.format(user_id)
+
+
+def cached_fields(model) -> list:
+    # Every column except the password hash, in concrete-field order for from_db()
+    return [f.attname for f in model._meta.concrete_fields if f.attname != "password"]
+
+
+def forget_cached_user(user_id) -> None:
+    try:
+        cache.delete(user_cache_key(user_id))
+    except Exception:
+        pass
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        # Revocation checks compare the password hash, which isn't cached
+        if api_settings.CHECK_REVOKE_TOKEN or api_settings.USER_ID_FIELD != "id":
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        key = user_cache_key(user_id)
+        try:
+            row = cache.get(key)
+        except Exception:
+            row = None
+        if row is None:
+            user = super().get_user(validated_token)
+            try:
+                row = {f: getattr(user, f) for f in cached_fields(self.user_model)}
+                cache.set(key, row, getattr(settings, "AUTH_USER_CACHE_SECONDS", 300))
+            except Exception:
+                pass
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not row["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return self.user_model.from_db(router.db_for_read(self.user_model), list(row), list(row.values()))
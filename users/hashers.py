@@ -0,0 +1,80 @@
+"""
+Password hashers with their cost read from settings.
+
+Accounts sign in with a 6-digit PIN, so there are only a million candidates:
+no work factor makes a leaked hash safe on its own, and the real protection
+is the login throttles in users.throttles. The hash cost is therefore a
+trade-off between offline cracking time and login CPU, and is tuned per
+deployment (PASSWORD_HASHER plus the PASSWORD_* cost settings) instead of
+taking Django's defaults.
+
+Each hasher keeps Django's algorithm name, so existing hashes still verify.
+When the stored hash was made by another algorithm or with other costs,
+must_update() is true and Django's check_password() re-hashes the PIN with
+the preferred hasher on the next successful login.
+"""
+import base64
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, "PASSWORD_PBKDF2_ITERATIONS", PBKDF2PasswordHasher.iterations)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return getattr(settings, "PASSWORD_SCRYPT_N", ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return getattr(settings, "PASSWORD_SCRYPT_R", ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, "PASSWORD_SCRYPT_P", ScryptPasswordHasher.parallelism)
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        # Same as Django's, but maxmem follows the n/r being hashed with: verify()
+        # passes the stored hash's parameters, which may be above the current
+        # setting, and hashlib.scrypt refuses anything over 32 MiB by default
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=2 * 128 * n * r + 1024 * 1024,
+            dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode("ascii").strip()
+        return "%s$%d$%s$%d$%d$%s" % (self.algorithm, n, salt, r, p, hash_)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Needs argon2-cffi; only listed in PASSWORD_HASHERS when it is installed."""
+
+    @property
+    def time_cost(self):
+        return getattr(settings, "PASSWORD_ARGON2_TIME_COST", Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, "PASSWORD_ARGON2_MEMORY_COST", Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, "PASSWORD_ARGON2_PARALLELISM", Argon2PasswordHasher.parallelism)
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, get_hashers
+from django.core.management.base import BaseCommand
+
+PIN_SPACE = 10 ** 6
+
+
+class Command(BaseCommand):
+    help = "Time PIN verification with each configured password hasher (logins/sec per core)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Verifications per hasher.")
+        parser.add_argument("--pin", default="482913")
+
+    def handle(self, *args, **options):
+        repeat, pin = options["repeat"], options["pin"]
+        preferred = get_hasher().algorithm
+        self.stdout.write(f"PASSWORD_HASHERS[0]: {settings.PASSWORD_HASHERS[0]}")
+        for hasher in get_hashers():
+            encoded = hasher.encode(pin, hasher.salt())
+            hasher.verify(pin, encoded)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                hasher.verify(pin, encoded)
+            per_login = (time.perf_counter() - start) / repeat
+            # One core checking every PIN against a leaked hash, worst case
+            exhaust_hours = PIN_SPACE * per_login / 3600
+            marker = "*" if hasher.algorithm == preferred else " "
+            params = " ".join(
+                f"{k}={v}" for k, v in hasher.decode(encoded).items() if k not in ("algorithm", "salt", "hash")
+            )
+            self.stdout.write(
+                f"{marker} {hasher.algorithm:<14} {per_login * 1000:8.1f} ms/login "
+                f"{1 / per_login:8.1f} logins/s/core  {exhaust_hours:8.1f} core-hours for all PINs  {params}"
+            )
@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_cached_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Drop now and again after commit, so a request racing the transaction
+    # can't leave the pre-commit row cached
+    forget_cached_user(instance.pk)
+    transaction.on_commit(lambda: forget_cached_user(instance.pk))
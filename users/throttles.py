@@ -0,0 +1,43 @@
+"""
+Brute-force limits for PIN sign-in and PIN reset.
+
+A 6-digit PIN has a million values, so online guessing is the attack that
+matters. Attempts are limited per target account (whatever IPs they come
+from) and per client IP (whatever accounts it tries). Rates live in
+REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] under the scopes below; counters
+sit in the shared cache, so the limits hold across workers.
+"""
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class AuthIPRateThrottle(SimpleRateThrottle):
+    """Sign-in and reset attempts per client IP, shared by both endpoints."""
+
+    scope = "auth_ip"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """Attempts per account, keyed on the submitted username."""
+
+    scope = "login"
+    field = "username"
+
+    def get_cache_key(self, request, view):
+        try:
+            value = request.data.get(self.field)
+        except AttributeError:
+            return None
+        if not isinstance(value, str) or not value.strip():
+            return None  # nothing to guess against; the serializer rejects it
+        ident = hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+
+class ResetPinRateThrottle(LoginRateThrottle):
+    scope = "reset_pin"
+    field = "phone"
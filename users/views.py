@@ -1,6 +1,8 @@
 from rest_framework import generics, permissions
 from .serializers import RegisterSerializer, UserSerializer
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.views import TokenObtainPairView
+from .throttles import AuthIPRateThrottle, LoginRateThrottle
 
 User = get_user_model()
 
@@ -15,3 +17,7 @@ class MeView(generics.RetrieveAPIView):
 
     def get_object(self):
         return self.request.user
+
+
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    throttle_classes = (AuthIPRateThrottle, LoginRateThrottle)